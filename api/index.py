@@ -6,37 +6,82 @@ for the Jharkhand Municipal Election Results.
 
 Routes:
   /           → HTML dashboard with summary + municipality table
+  /m/<slug>   → One page of a municipality's ward table (HTML fragment,
+                ?page=N), loaded by the dashboard when a section is opened
   /api/data   → Raw JSON election data
+  /api/summary, /api/municipalities
+              → State totals and per-ULB progress
+  /api/municipalities/<name or slug>/wards
+              → One ULB's wards; ?status=, ?fields=a,b,c, ?limit=, ?offset=
+  /api/search → Ward and candidate names matching ?q= (Hindi or Latin
+                spelling), statewide or ?municipality=; ?limit=, ?offset=
+  /api/stream → Server-Sent Events: ward changes and heartbeats
+                (long-running servers only; 501 on serverless)
+  /metrics    → Prometheus metrics: cache hits, bytes served, render and
+                parse timings, data age (ELECTION_METRICS=0 disables)
+
+`python api/index.py` runs the same handler as a long-running local
+server (threaded, with a background data fetcher), and api/server.py
+serves the same routes from asyncio. /api/stream is only served in these
+modes: a serverless instance would hold the stream open until its
+request timeout, so it answers 501 instead.
+
+All routes send ETag / Last-Modified validators derived from the data
+version and answer matching conditional requests with 304, so polling
+clients and the Vercel edge cache do not re-download unchanged results.
+
+Response bodies are rendered and compressed (gzip, and brotli when the
+`brotli` package is installed) once per data version and kept in memory,
+so a warm request only negotiates an encoding and writes bytes.
 """
 
-from http.server import BaseHTTPRequestHandler
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gzip
 import json
 import os
+import sys
+import threading
 import traceback
+from urllib.parse import parse_qs, quote, unquote, urlencode
 
-DATA = None
+try:
+    import brotli
+except ImportError:  # brotli is optional; responses fall back to gzip
+    brotli = None
 
-def load_results():
-    global DATA
-    if DATA is not None:
-        return DATA
-
-    search_paths = [
-        os.path.join(os.getcwd(), "data", "sample_data.json"),
-        os.path.join(os.path.dirname(__file__), "..", "data", "sample_data.json"),
-        os.path.join(os.path.dirname(__file__), "data", "sample_data.json"),
-        "/var/task/data/sample_data.json",
-        "/var/task/api/data/sample_data.json",
-    ]
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), "..")))
+
+from election import metrics, query, render
+from election.events import HEARTBEAT, HEARTBEAT_SECONDS, RETRY_MS, EventHub, format_event
+from election.source import DataSource
+
+SEARCH_PATHS = [
+    os.path.join(os.getcwd(), "data", "sample_data.json"),
+    os.path.join(os.path.dirname(__file__), "..", "data", "sample_data.json"),
+    os.path.join(os.path.dirname(__file__), "data", "sample_data.json"),
+    "/var/task/data/sample_data.json",
+    "/var/task/api/data/sample_data.json",
+]
 
-    for p in search_paths:
-        p = os.path.normpath(p)
-        if os.path.isfile(p):
-            with open(p, "r", encoding="utf-8") as f:
-                DATA = json.load(f)
-            return DATA
+# Reloads when the file's mtime or the ELECTION_DATA_URL body changes
+SOURCE = DataSource.from_env(SEARCH_PATHS).register_gauges()
 
-    return {"error": "Data file not found", "searched": search_paths}
+# Ward change events for /api/stream, fed by every new snapshot
+EVENTS = EventHub()
+SOURCE.subscribe(EVENTS.update)
+
+
+def load_results():
+    """Return the current results document, or an error dict if none loaded."""
+    snap = SOURCE.get()
+    if snap is None:
+        return {"error": SOURCE.error or "Data not loaded", "searched": SOURCE.paths}
+    return snap.data
 
 
 PARTY_COLORS = {
@@ -45,33 +90,57 @@ PARTY_COLORS = {
 }
 
 
-def build_ward_rows(munis):
-    """Build detailed ward-level HTML rows grouped by municipality."""
-    sections = ""
-    for m in munis:
-        wards = m.get("wards", [])
-        if not wards:
-            continue
-        sections += f'<div class="card"><h2>{m["name"]}</h2>'
-        sections += '<table><thead><tr><th>Ward</th><th>Status</th><th>Winner / Leading</th><th>Party</th><th>Votes</th><th>Margin</th><th>Turnout</th></tr></thead><tbody>'
-        for w in sorted(wards, key=lambda x: x["ward_no"]):
-            status = w["status"]
-            badge = "badge-declared" if status == "Declared" else "badge-counting"
-            winner = w.get("winner") or (w["candidates"][0]["name"] if w.get("candidates") else "—")
-            party = w.get("winner_party") or (w["candidates"][0]["party"] if w.get("candidates") else "—")
-            votes = w.get("winner_votes", 0) or (w["candidates"][0]["votes"] if w.get("candidates") else 0)
-            pc = PARTY_COLORS.get(party, "#999")
-            sections += (
-                f'<tr><td>Ward {w["ward_no"]}</td>'
-                f'<td><span class="badge {badge}">{status}</span></td>'
-                f'<td><strong>{winner}</strong></td>'
-                f'<td style="color:{pc};font-weight:700">{party}</td>'
-                f'<td>{votes:,}</td>'
-                f'<td>{w.get("margin",0):,}</td>'
-                f'<td>{w.get("turnout",0):.1f}%</td></tr>'
-            )
-        sections += '</tbody></table></div>'
-    return sections
+WARD_TABLE = render.TableSpec("api-wards", [
+    ("Ward", "Ward No.", render.ward_label),
+    ("Status", "Status", render.status_badge("badge")),
+    ("Winner / Leading", "Winner/Leading", render.strong),
+    ("Party", "Party", render.party(PARTY_COLORS, inline=False)),
+    ("Votes", "Votes", render.thousands),
+    ("Margin", "Margin", render.thousands),
+    ("Turnout", "Turnout %", render.percent),
+])
+
+
+# Wards per /m/<slug> fragment; larger municipalities are paged
+WARD_PAGE_SIZE = 50
+
+
+def build_ward_sections(snap):
+    """
+    Build one collapsed section per municipality. Ward tables are not
+    inlined; the page script loads them from /m/<slug> when a section is
+    opened, so the page size does not grow with the number of wards.
+    """
+    return "".join(
+        f'<details class="card" data-src="/m/{quote(query.slugify(m["name"]))}">'
+        f'<summary><h2>{escape(m["name"])}</h2> '
+        f'<span class="muted">{len(snap.muni_ward_ids[m["name"]])} wards</span></summary>'
+        f'<div class="wards"><a href="/m/{quote(query.slugify(m["name"]))}">View wards</a></div></details>'
+        for m in snap.municipalities
+        if snap.muni_ward_ids[m["name"]]
+    )
+
+
+def render_municipality(snap, slug: str, page: int) -> str:
+    """
+    Render one page of a municipality's ward table as an HTML fragment,
+    followed by a "show more" button when more pages remain.
+    Raises query.NotFound for an unknown municipality or page.
+    """
+    name = query.find_municipality(snap, slug)
+    ward_ids = snap.muni_ward_ids[name]
+    start = (page - 1) * WARD_PAGE_SIZE
+    if page < 1 or (start >= len(ward_ids) and page > 1):
+        raise query.NotFound(f"no page {page} for {slug}")
+
+    end = start + WARD_PAGE_SIZE
+    fragment = render.ward_table(WARD_TABLE, snap, name, ward_ids[start:end])
+    if end < len(ward_ids):
+        fragment += (
+            f'<button class="more" data-src="/m/{quote(slug)}?page={page + 1}">'
+            f"Show more wards ({end} of {len(ward_ids)})</button>"
+        )
+    return fragment
 
 
 HTML_TEMPLATE = """<!DOCTYPE html>
@@ -142,6 +211,14 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             margin-top: 1.5rem; text-align: center; font-size: 0.78rem;
             opacity: 0.5; max-width: 1000px; border-top: 1px solid #333; padding-top: 1rem;
         }}
+        details > summary {{ cursor: pointer; list-style: none; }}
+        details > summary h2 {{ display: inline; margin: 0; }}
+        details[open] > summary {{ margin-bottom: 0.8rem; }}
+        .muted {{ font-size: 0.8rem; opacity: 0.6; }}
+        .more {{
+            margin-top: 0.6rem; padding: 6px 14px; border: 1px solid #333; border-radius: 8px;
+            background: #161622; color: #e0e0e0; cursor: pointer;
+        }}
         a {{ color: #19AAED; text-decoration: none; }}
         a:hover {{ text-decoration: underline; }}
         @media (max-width: 600px) {{
@@ -189,85 +266,517 @@ HTML_TEMPLATE = """<!DOCTYPE html>
         &copy; 2026 Jharkhand Nikay Chunav Results Dashboard &nbsp;|&nbsp;
         <a href="/api/data">JSON API</a>
     </div>
+    <script>
+        // Ward tables load when a municipality is opened, one page at a time.
+        function loadInto(el, url) {{
+            return fetch(url).then(function (r) {{
+                if (!r.ok) throw new Error(r.status);
+                return r.text();
+            }}).then(function (html) {{ el.insertAdjacentHTML("beforeend", html); }});
+        }}
+        document.addEventListener("toggle", function (e) {{
+            var d = e.target;
+            if (!d.open || !d.dataset.src || d.dataset.loaded) return;
+            d.dataset.loaded = "1";
+            var box = d.querySelector(".wards");
+            box.textContent = "Loading…";
+            loadInto(box, d.dataset.src).then(function () {{
+                box.firstChild.remove();
+            }}).catch(function () {{
+                box.textContent = "Could not load wards.";
+                delete d.dataset.loaded;
+            }});
+        }}, true);
+        document.addEventListener("click", function (e) {{
+            var b = e.target.closest("button.more");
+            if (!b) return;
+            b.disabled = true;
+            loadInto(b.parentNode, b.dataset.src).then(function () {{ b.remove(); }})
+                .catch(function () {{ b.disabled = false; }});
+        }});
+    </script>
 </body>
 </html>"""
 
 
+# Browsers revalidate after a few seconds; the CDN may serve a cached copy
+# for a little longer while it refetches in the background.
+CACHE_CONTROL = "public, max-age=5, s-maxage=10, stale-while-revalidate=30"
+
+
+_validators = (None, None)  # (version, (ETag, Last-Modified))
+
+
+def validators(snap):
+    """Return the (ETag, Last-Modified) header values for a snapshot."""
+    global _validators
+    version, values = _validators
+    if version == snap.version:
+        return values
+    etag = f'"{snap.version}"'
+    updated = snap.updated_at
+    if updated is None:
+        values = (etag, None)
+    else:
+        values = (etag, format_datetime(updated.astimezone(timezone.utc), usegmt=True))
+    _validators = (snap.version, values)
+    return values
+
+
+def is_not_modified(headers, etag, last_modified) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against our validators."""
+    inm = headers.get("If-None-Match")
+    if inm is not None:
+        tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+        return "*" in tags or etag in tags
+
+    ims = headers.get("If-Modified-Since")
+    if ims and last_modified:
+        try:
+            return parsedate_to_datetime(ims) >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def render_html(snap) -> str:
+    """Render the full HTML dashboard for a snapshot."""
+    # Municipality progress rows
+    muni_rows = []
+    for m in snap.muni_progress:
+        dec, total = m["declared"], m["total_wards"]
+        badge_cls = "badge-declared" if dec == total else "badge-counting"
+        badge_txt = "Complete" if dec == total else f"Counting ({dec}/{total})"
+        muni_rows.append(
+            f"<tr><td><strong>{escape(str(m['name']))}</strong></td><td>{escape(str(m['type']))}</td>"
+            f"<td>{total}</td><td>{dec}</td>"
+            f'<td><span class="badge {badge_cls}">{badge_txt}</span></td></tr>'
+        )
+
+    # Party seats chips
+    party_chips = [
+        f'<span class="party-chip" style="background:{PARTY_COLORS.get(p, "#999")}">{escape(str(p))}: {count}</span>'
+        for p, count in snap.party_seats.items()
+    ]
+
+    # Ward sections (tables load on demand from /m/<slug>)
+    ward_sections = build_ward_sections(snap)
+
+    return HTML_TEMPLATE.format(
+        total_ulbs=len(snap.municipalities),
+        total_wards=snap.total_wards,
+        declared_count=snap.declared_count,
+        turnout=escape(str(snap.summary.get("turnout", "—"))),
+        muni_rows="".join(muni_rows),
+        party_chips="".join(party_chips),
+        ward_sections=ward_sections,
+    )
+
+
+def render_json(snap) -> str:
+    """Serialize the full results document."""
+    return json.dumps(snap.data, ensure_ascii=False)
+
+
+def json_response(result) -> str:
+    return json.dumps(result, ensure_ascii=False)
+
+
+# path -> (content type, renderer); unknown paths get the HTML dashboard
+ROUTES = {
+    "/": ("text/html; charset=utf-8", render_html),
+    "/api/data": ("application/json", render_json),
+    "/api/summary": ("application/json", lambda snap: json_response(query.summary(snap))),
+    "/api/municipalities": ("application/json", lambda snap: json_response(query.municipalities(snap))),
+}
+
+
+@lru_cache(maxsize=1024)
+def resolve(path: str):
+    """
+    Map a request path to (route, content type, renderer). `route` is the
+    normalized path (plus page for /m/<slug>) and is the response cache key.
+    """
+    route, _, qs = path.partition("?")
+    route = route.rstrip("/") or "/"
+    params = {k: v[0] for k, v in parse_qs(qs).items()}
+    if route.startswith("/m/"):
+        slug = unquote(route[3:])  # browsers percent-encode Devanagari slugs
+        try:
+            page = int(params.get("page", "1"))
+        except ValueError:
+            page = 0  # rejected by render_municipality
+        return (
+            f"/m/{slug}?page={page}",
+            "text/html; charset=utf-8",
+            lambda snap: render_municipality(snap, slug, page),
+        )
+    if route == "/api/search":
+        params = {k: params[k] for k in ("q", "municipality", "limit", "offset") if k in params}
+        key = f"{route}?{urlencode(sorted(params.items()))}"
+        return (
+            key,
+            "application/json",
+            lambda snap: json_response(query.search(snap, params)),
+        )
+    parts = route.split("/")
+    if len(parts) == 5 and parts[1:3] == ["api", "municipalities"] and parts[4] == "wards":
+        name = unquote(parts[3])
+        params = {k: params[k] for k in ("status", "fields", "limit", "offset") if k in params}
+        key = f"{route}?{urlencode(sorted(params.items()))}"
+        return (
+            key,
+            "application/json",
+            lambda snap: json_response(query.wards(snap, name, params)),
+        )
+    if route not in ROUTES:
+        route = "/"
+    content_type, renderer = ROUTES[route]
+    return route, content_type, renderer
+
+
+# ---------------------------------------------------------------------------
+# Response cache – encoded bodies for the current data version
+# ---------------------------------------------------------------------------
+# Pages and fixed API routes are a bounded set per version; past this many
+# cached bodies (e.g. odd spellings of /m/ slugs), further routes are
+# rendered per request.
+MAX_CACHED_RESPONSES = 512
+# Query routes (?q=, ?fields=, ...) are unbounded, so they get their own
+# small LRU and can never crowd the pages out of the cache.
+MAX_CACHED_QUERIES = 64
+
+# (version, Snapshot.serial, route -> variants, query route -> variants in LRU order)
+_responses = (None, 0, {}, OrderedDict())
+_responses_lock = threading.Lock()
+
+_CACHE_HIT = metrics.counter("response_cache", result="hit")
+_CACHE_MISS = metrics.counter("response_cache", result="miss")
+
+
+def encode_variants(text: str) -> dict:
+    """Return the identity, gzip and (if available) brotli encodings of `text`."""
+    body = text.encode("utf-8")
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=5)
+    return variants
+
+
+def cached_body(snap, route: str, renderer) -> dict:
+    """
+    Return the encoded variants for `route` at the snapshot's data version,
+    rendering them with `renderer(snap)` on first use. The cache is dropped
+    when a newer snapshot's version arrives; requests still holding an
+    older snapshot render without caching.
+    """
+    global _responses
+    version, _, bodies, _ = _responses  # one read: a swap cannot split it
+    if version == snap.version and route in bodies:
+        _CACHE_HIT.inc()
+        return bodies[route]
+
+    with _responses_lock:
+        version, serial, bodies, queries = _responses
+        if version != snap.version:
+            if snap.serial > serial:
+                bodies, queries = {}, OrderedDict()
+                _responses = (snap.version, snap.serial, bodies, queries)
+            else:
+                bodies = queries = None  # an older snapshot must not evict the newer cache
+        elif route in bodies:
+            _CACHE_HIT.inc()
+            return bodies[route]
+        elif route in queries:
+            _CACHE_HIT.inc()
+            queries.move_to_end(route)
+            return queries[route]
+        _CACHE_MISS.inc()
+        with metrics.timer("render", route=route_family(route)):
+            variants = encode_variants(renderer(snap))
+        if queries is not None and is_query(route):
+            queries[route] = variants
+            if len(queries) > MAX_CACHED_QUERIES:
+                queries.popitem(last=False)
+        elif bodies is not None and len(bodies) < MAX_CACHED_RESPONSES:
+            bodies[route] = variants
+        return variants
+
+
+def is_query(route: str) -> bool:
+    """True for routes keyed by client query parameters (search, ward lists)."""
+    return route.startswith(("/api/search?", "/api/municipalities/"))
+
+
+def route_family(route: str) -> str:
+    """A route with its slug/name/query removed, for metric labels."""
+    if route.startswith("/m/"):
+        return "/m/{slug}"
+    if route.startswith("/api/municipalities/"):
+        return "/api/municipalities/{name}/wards"
+    return route.partition("?")[0]
+
+
+metrics.gauge(
+    "response_cache_entries", lambda: len(_responses[2]) + len(_responses[3]),
+    "Encoded bodies cached for the current version",
+)
+
+
+def is_cached(snap, route: str) -> bool:
+    """
+    True if `route` is already rendered for the snapshot's version and can
+    be read without taking the cache lock (query routes never are).
+    """
+    version, _, bodies, _ = _responses
+    return version == snap.version and route in bodies
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str:
+    """Pick the best of br/gzip that the client accepts, else identity."""
+    accepted = accepted_encodings(accept_encoding)
+    for enc in ("br", "gzip"):
+        if enc in available and (enc in accepted or "*" in accepted):
+            return enc
+    return "identity"
+
+
+@lru_cache(maxsize=256)
+def accepted_encodings(accept_encoding: str) -> frozenset:
+    """The codings an Accept-Encoding header accepts (q > 0)."""
+    accepted = set()
+    for token in accept_encoding.split(","):
+        name, _, params = token.partition(";")
+        params = params.replace(" ", "")
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return frozenset(accepted)
+
+
+# ---------------------------------------------------------------------------
+# Request handling (shared by the Vercel handler and api/server.py)
+# ---------------------------------------------------------------------------
+STREAM_PATH = "/api/stream"
+STREAM_HEADERS = [
+    ("Content-Type", "text/event-stream; charset=utf-8"),
+    ("Cache-Control", "no-cache"),
+    ("X-Accel-Buffering", "no"),
+    ("Access-Control-Allow-Origin", "*"),
+]
+
+
+METRICS_PATH = "/metrics"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def is_stream(path: str) -> bool:
+    return path.split("?", 1)[0].rstrip("/") == STREAM_PATH
+
+
+def metrics_response():
+    """The /metrics scrape: never cached, served even before data loads."""
+    body = metrics.render_prometheus().encode("utf-8")
+    return 200, [
+        ("Content-Type", METRICS_CONTENT_TYPE),
+        ("Cache-Control", "no-store"),
+        ("Content-Length", str(len(body))),
+    ], body
+
+
+def validator_headers(etag, last_modified) -> list:
+    headers = [("ETag", etag)]
+    if last_modified:
+        headers.append(("Last-Modified", last_modified))
+    headers.append(("Cache-Control", CACHE_CONTROL))
+    headers.append(("Vary", "Accept-Encoding"))
+    return headers
+
+
+def error_response(status: int, message: str, content_type: str):
+    """A 4xx as JSON for API routes, plain text otherwise."""
+    if content_type == "application/json":
+        body = json.dumps({"error": message}).encode("utf-8")
+    else:
+        content_type, body = "text/plain; charset=utf-8", message.encode("utf-8")
+    return status, [
+        ("Content-Type", content_type),
+        ("Access-Control-Allow-Origin", "*"),
+        ("Content-Length", str(len(body))),
+    ], body
+
+
+def server_error_response():
+    body = f"<h1>Error</h1><pre>{traceback.format_exc()}</pre>".encode("utf-8")
+    return 500, [
+        ("Content-Type", "text/html; charset=utf-8"),
+        ("Content-Length", str(len(body))),
+    ], body
+
+
+_OK = metrics.counter("responses", status="200")
+_NOT_MODIFIED = metrics.counter("responses", status="304")
+_BYTES_SERVED = {enc: metrics.counter("bytes_served", encoding=enc) for enc in ("identity", "gzip", "br")}
+
+
+def respond(snap, path: str, headers):
+    """
+    Answer a GET for `path` (anything but the stream) as
+    (status, [(header, value)], body). `headers` is the request headers
+    mapping.
+    """
+    if path.startswith(METRICS_PATH) and path.split("?", 1)[0].rstrip("/") == METRICS_PATH:
+        return metrics_response()
+    if snap is None:
+        body = json.dumps(load_results()).encode("utf-8")
+        return 500, [("Content-Type", "application/json"), ("Content-Length", str(len(body)))], body
+
+    route, content_type, renderer = resolve(path)
+    try:
+        variants = cached_body(snap, route, renderer)
+    except (query.NotFound, query.BadRequest) as e:
+        status = 404 if isinstance(e, query.NotFound) else 400
+        metrics.inc("responses", status=str(status))
+        return error_response(status, str(e), content_type)
+    encoding = negotiate_encoding(headers.get("Accept-Encoding", ""), variants)
+    etag, last_modified = validators(snap)
+    if encoding != "identity":
+        etag = f'{etag[:-1]}-{encoding}"'
+
+    if is_not_modified(headers, etag, last_modified):
+        _NOT_MODIFIED.inc()
+        return 304, validator_headers(etag, last_modified), b""
+
+    body = variants[encoding]
+    _OK.inc()
+    _BYTES_SERVED[encoding].inc(len(body))
+    out = [("Content-Type", content_type)]
+    if route.startswith("/api/"):
+        out.append(("Access-Control-Allow-Origin", "*"))
+    if encoding != "identity":
+        out.append(("Content-Encoding", encoding))
+    out.append(("Content-Length", str(len(body))))
+    return 200, out + validator_headers(etag, last_modified), body
+
+
+def _stream_state(snap) -> dict:
+    return {"version": snap.version, "last_updated": snap.last_updated}
+
+
+def stream_start(snap, last_event_id: str):
+    """
+    Open an event stream: returns (first messages, last event id sent).
+    A known Last-Event-ID replays what the client missed; an unknown one
+    gets a "reset" event.
+    """
+    try:
+        last_id = int(last_event_id or "")
+    except ValueError:
+        last_id = None
+    metrics.inc("streams_opened")
+    backlog = EVENTS.since(last_id) if last_id is not None else None
+    out = [f"retry: {RETRY_MS}\n\n".encode("utf-8")]
+    if backlog is None:
+        event = "hello" if last_id is None else "reset"
+        last_id = EVENTS.last_id
+        out.append(format_event(event, _stream_state(snap), last_id))
+    elif backlog:
+        last_id = backlog[-1][0]
+        out.extend(msg for _, msg in backlog)
+    return out, last_id
+
+
+def stream_step(snap, messages, last_id: int):
+    """Turn the result of EVENTS.since()/wait() into (messages to send, last id)."""
+    if messages is None:
+        last_id = EVENTS.last_id
+        return [format_event("reset", _stream_state(snap), last_id)], last_id
+    if messages:
+        return [msg for _, msg in messages], messages[-1][0]
+    return [], last_id
+
+
+def stream_unavailable_response():
+    """/api/stream without a background fetcher, i.e. on serverless instances."""
+    metrics.inc("responses", status="501")
+    return error_response(
+        501, "Event streams need a long-running server (api/server.py)", "application/json",
+    )
+
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
-            data = load_results()
-
-            if "error" in data:
-                self.send_response(500)
-                self.send_header("Content-Type", "application/json")
-                self.end_headers()
-                self.wfile.write(json.dumps(data).encode("utf-8"))
-                return
-
-            if self.path == "/api/data" or self.path == "/api/data/":
-                self.send_response(200)
-                self.send_header("Content-Type", "application/json")
-                self.send_header("Access-Control-Allow-Origin", "*")
-                self.end_headers()
-                self.wfile.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
-                return
-
-            summary = data.get("summary", {})
-            munis = data.get("municipalities", [])
-
-            # Municipality progress rows
-            muni_rows = ""
-            total_declared = 0
-            for m in munis:
-                wards = m.get("wards", [])
-                dec = sum(1 for w in wards if w["status"] == "Declared")
-                total_declared += dec
-                total = m["total_wards"]
-                badge_cls = "badge-declared" if dec == total else "badge-counting"
-                badge_txt = "Complete" if dec == total else f"Counting ({dec}/{total})"
-                muni_rows += (
-                    f"<tr><td><strong>{m['name']}</strong></td><td>{m.get('type','')}</td>"
-                    f"<td>{total}</td><td>{dec}</td>"
-                    f'<td><span class="badge {badge_cls}">{badge_txt}</span></td></tr>'
-                )
-
-            # Party seats chips
-            party_count = {}
-            for m in munis:
-                for w in m.get("wards", []):
-                    if w["status"] == "Declared" and w.get("winner_party"):
-                        p = w["winner_party"]
-                        party_count[p] = party_count.get(p, 0) + 1
-            party_chips = ""
-            for p, count in sorted(party_count.items(), key=lambda x: -x[1]):
-                clr = PARTY_COLORS.get(p, "#999")
-                party_chips += f'<span class="party-chip" style="background:{clr}">{p}: {count}</span>'
-
-            # Ward detail sections
-            ward_sections = build_ward_rows(munis)
-
-            html = HTML_TEMPLATE.format(
-                total_ulbs=len(munis),
-                total_wards=summary.get("total_wards", sum(m["total_wards"] for m in munis)),
-                declared_count=total_declared,
-                turnout=summary.get("turnout", "—"),
-                muni_rows=muni_rows,
-                party_chips=party_chips,
-                ward_sections=ward_sections,
-            )
-
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html; charset=utf-8")
-            self.end_headers()
-            self.wfile.write(html.encode("utf-8"))
-
-        except Exception as e:
-            self.send_response(500)
-            self.send_header("Content-Type", "text/html; charset=utf-8")
-            self.end_headers()
-            err = f"<h1>Error</h1><pre>{traceback.format_exc()}</pre>"
-            self.wfile.write(err.encode("utf-8"))
+            if is_stream(self.path) and not SOURCE.background:
+                status, headers, body = stream_unavailable_response()
+            else:
+                snap = SOURCE.get()
+                if snap is not None and is_stream(self.path):
+                    self.stream_events(snap)
+                    return
+                status, headers, body = respond(snap, self.path, self.headers)
+        except Exception:
+            status, headers, body = server_error_response()
+
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, snap):
+        """
+        Server-Sent Events: ward change events as snapshots change, and a
+        heartbeat comment when nothing happened for HEARTBEAT_SECONDS.
+        Runs until the client disconnects.
+        """
+        self.send_response(200)
+        for name, value in STREAM_HEADERS:
+            self.send_header(name, value)
+        self.end_headers()
+
+        out, last_id = stream_start(snap, self.headers.get("Last-Event-ID"))
+        try:
+            while True:
+                if out:
+                    self.wfile.write(b"".join(out))
+                    self.wfile.flush()
+                snap = SOURCE.get() or snap
+                out, last_id = stream_step(snap, EVENTS.wait(last_id, HEARTBEAT_SECONDS), last_id)
+                if not out:
+                    out.append(HEARTBEAT)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
 
     def log_message(self, format, *args):
         pass
+
+
+# ---------------------------------------------------------------------------
+# Local long-running server
+# ---------------------------------------------------------------------------
+def serve(host: str = "127.0.0.1", port: int = 8000):
+    """Serve all routes, including /api/stream, from one long-lived process."""
+    SOURCE.start()
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"Serving on http://{host}:{port}  (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the results API as a local server.")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args()
+    serve(args.host, args.port)
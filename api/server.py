@@ -0,0 +1,278 @@
+"""
+Standalone Server
+=================
+Self-hosted entry point for the results API, built on asyncio:
+
+    python api/server.py --host 0.0.0.0 --port 8000 --workers 4
+
+It serves the same routes as the Vercel function (routing, rendering,
+response cache and conditional GET all come from api/index.py), plus:
+
+  - HTTP/1.1 keep-alive and pipelined requests on many concurrent
+    connections, in one event loop per process.
+  - Cached responses are answered on the event loop; a response that has
+    to be rendered first runs on a bounded thread pool (--render-threads)
+    so slow renders never stall the loop.
+  - Data is fetched by the background DataSource thread; new snapshots
+    are swapped in without dropping connections. SIGHUP forces a reload
+    check right away.
+  - /api/stream watchers are coroutines woken once per data update.
+  - SIGTERM / SIGINT stop accepting connections and give in-flight
+    requests a few seconds to finish.
+  - --workers N forks N processes sharing the port (SO_REUSEPORT).
+  - uvloop is used when installed.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import index  # noqa: E402  (api/index.py: routes, caches, data source)
+
+MAX_HEADER_BYTES = 16 * 1024
+KEEP_ALIVE_SECONDS = 15
+SHUTDOWN_GRACE_SECONDS = 5
+DEFAULT_RENDER_THREADS = 4
+
+
+class Headers(dict):
+    """Request headers with case-insensitive `get`, as index.respond expects."""
+
+    def get(self, name, default=None):
+        return super().get(name.lower(), default)
+
+
+_date_cache = (0, b"")
+
+
+def http_date() -> bytes:
+    """The Date header value, formatted at most once per second."""
+    global _date_cache
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache = (now, formatdate(now, usegmt=True).encode("ascii"))
+    return _date_cache[1]
+
+
+def response_head(status: int, headers, keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}".encode("ascii")]
+    lines.append(b"Date: " + http_date())
+    lines.extend(f"{name}: {value}".encode("latin-1") for name, value in headers)
+    lines.append(b"Connection: keep-alive" if keep_alive else b"Connection: close")
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+class Server:
+    def __init__(self, render_threads: int = DEFAULT_RENDER_THREADS):
+        self.pool = ThreadPoolExecutor(max_workers=render_threads, thread_name_prefix="render")
+        self.connections = set()
+        self.closing = False
+        self._changed = None  # asyncio.Event set (and replaced) on every update
+
+    # -- data updates ------------------------------------------------------
+    def _on_update(self, old, new):
+        # Called on the fetcher thread, after index.EVENTS has the new events
+        self.loop.call_soon_threadsafe(self._wake_watchers)
+
+    def _wake_watchers(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def reload(self):
+        """Run a reload check now (SIGHUP) without waiting for the poll interval."""
+        await self.loop.run_in_executor(self.pool, index.SOURCE.refresh)
+
+    # -- connections -------------------------------------------------------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while not self.closing:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    writer.write(response_head(431, [("Content-Length", "0")], False))
+                    return
+
+                request = self.parse(head)
+                if request is None:
+                    writer.write(response_head(400, [("Content-Length", "0")], False))
+                    return
+                method, path, version, headers = request
+                keep_alive = not self.closing and (
+                    headers.get("connection", "").lower() != "close"
+                    if version == "HTTP/1.1"
+                    else headers.get("connection", "").lower() == "keep-alive"
+                )
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(response_head(400, [("Content-Length", "0")], False))
+                    return
+                if length:
+                    await reader.readexactly(length)  # ignored, GET/HEAD only
+
+                if method not in ("GET", "HEAD"):
+                    writer.write(response_head(405, [("Allow", "GET, HEAD"), ("Content-Length", "0")], keep_alive))
+                elif index.is_stream(path) and method == "HEAD":
+                    writer.write(response_head(200, index.STREAM_HEADERS, keep_alive))
+                elif index.is_stream(path):
+                    await self.stream(writer, headers)
+                    return
+                else:
+                    status, out_headers, body = await self.respond(path, headers)
+                    writer.write(response_head(status, out_headers, keep_alive))
+                    if method == "GET" and body:
+                        writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    @staticmethod
+    def parse(head: bytes):
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, path, version = lines[0].split(" ", 2)
+        except ValueError:
+            return None
+        headers = Headers()
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return method, path, version, headers
+
+    async def respond(self, path: str, headers: Headers):
+        try:
+            snap = index.SOURCE.get()
+            if snap is not None:
+                route, _, _ = index.resolve(path)
+                if index.is_cached(snap, route):
+                    return index.respond(snap, path, headers)
+            # Needs rendering (or an error page): keep it off the event loop
+            return await self.loop.run_in_executor(self.pool, index.respond, snap, path, headers)
+        except Exception:
+            return index.server_error_response()
+
+    async def stream(self, writer: asyncio.StreamWriter, headers: Headers):
+        snap = index.SOURCE.get()
+        if snap is None:
+            status, out_headers, body = index.respond(None, "/", headers)
+            writer.write(response_head(status, out_headers, False) + body)
+            return
+        writer.write(response_head(200, index.STREAM_HEADERS, False))
+        out, last_id = index.stream_start(snap, headers.get("last-event-id"))
+        while not self.closing:
+            if out:
+                writer.write(b"".join(out))
+                await writer.drain()
+            changed = self._changed
+            messages = index.EVENTS.since(last_id)
+            if messages == []:
+                try:
+                    await asyncio.wait_for(changed.wait(), index.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    out = [index.HEARTBEAT]
+                    continue
+                messages = index.EVENTS.since(last_id)
+            out, last_id = index.stream_step(index.SOURCE.get() or snap, messages, last_id)
+
+    # -- lifecycle -----------------------------------------------------------
+    async def run(self, host: str, port: int, reuse_port: bool = False):
+        self.loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        index.SOURCE.subscribe(self._on_update)
+        index.SOURCE.start()
+        # Only the first get() can block (until the first load); do it here
+        await self.loop.run_in_executor(self.pool, index.SOURCE.get)
+
+        server = await asyncio.start_server(
+            self.handle, host, port, limit=MAX_HEADER_BYTES,
+            reuse_port=reuse_port or None, backlog=2048,
+        )
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            self.loop.add_signal_handler(sig, stop.set)
+        if hasattr(signal, "SIGHUP"):
+            self.loop.add_signal_handler(signal.SIGHUP, lambda: self.loop.create_task(self.reload()))
+
+        print(f"[{os.getpid()}] Serving on http://{host}:{port}", flush=True)
+        async with server:
+            await stop.wait()
+            self.closing = True
+            server.close()
+            self._wake_watchers()
+            if self.connections:
+                await asyncio.wait(set(self.connections), timeout=SHUTDOWN_GRACE_SECONDS)
+            for task in self.connections:
+                task.cancel()
+        self.pool.shutdown(wait=False)
+
+
+def run_server(host: str, port: int, render_threads: int, reuse_port: bool = False):
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(Server(render_threads).run(host, port, reuse_port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the results API with asyncio.")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes sharing the port (SO_REUSEPORT)")
+    parser.add_argument("--render-threads", type=int, default=DEFAULT_RENDER_THREADS,
+                        help="threads per process for rendering uncached responses")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_server(args.host, args.port, args.render_threads)
+        return
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            run_server(args.host, args.port, args.render_threads, reuse_port=True)
+            os._exit(0)
+        children.append(pid)
+
+    def forward(sig, frame):
+        for pid in children:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, forward)
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+
+
+if __name__ == "__main__":
+    main()
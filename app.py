@@ -12,20 +12,26 @@ To replace sample data with real data:
 
 Run locally:
   streamlit run app.py
+
+Set ELECTION_DEBUG=1 on the server for a sidebar panel with cache hit
+counts, parse/render timings and the data version's age.
 """
 
-import json
 import os
-import time
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 import streamlit.components.v1 as components
 
+from election import Snapshot, exports, metrics, projection, render, swing
+from election import search as name_search
+from election.source import DataSource
+
 # ---------------------------------------------------------------------------
 # Page config – must be the first Streamlit command
 # ---------------------------------------------------------------------------
@@ -74,6 +80,9 @@ WHITE = "#FFFFFF"
 LIGHT_BG = "#F8F9FA"
 DARK_BG = "#0E1117"
 
+# How often open sessions check whether a new data version is available
+REFRESH_SECONDS = 15
+
 PARTY_COLORS = {
     "JMM": "#2E7D32",
     "BJP": "#FF9933",
@@ -241,54 +250,28 @@ def inject_css(dark_mode: bool):
 # ---------------------------------------------------------------------------
 # Data loading
 # ---------------------------------------------------------------------------
-@st.cache_data(ttl=10)
-def load_data() -> dict:
+@st.cache_resource
+def get_source() -> DataSource:
     """
-    Load election data from local JSON or a remote URL.
+    Process-wide results source shared by every session.
+    Data is fetched by one background thread (conditional requests, backoff
+    on failure); sessions only ever read the last good snapshot.
     Set env var ELECTION_DATA_URL to point to a live endpoint.
     """
-    url = os.getenv("ELECTION_DATA_URL")
-    if url:
-        import urllib.request
-        with urllib.request.urlopen(url) as resp:
-            return json.loads(resp.read().decode())
-
     data_path = Path(__file__).parent / "data" / "sample_data.json"
-    with open(data_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def flatten_wards(data: dict) -> pd.DataFrame:
-    """Flatten all ward records across municipalities into a single DataFrame."""
-    rows = []
-    for muni in data["municipalities"]:
-        for w in muni.get("wards", []):
-            row = {
-                "Municipality": muni["name"],
-                "Type": muni.get("type", ""),
-                "Ward No.": w["ward_no"],
-                "Ward Name": w.get("ward_name", f"Ward {w['ward_no']}"),
-                "Status": w["status"],
-                "Winner/Leading": w.get("winner") or (
-                    w["candidates"][0]["name"] if w.get("candidates") else "—"
-                ),
-                "Party": w.get("winner_party") or (
-                    w["candidates"][0]["party"] if w.get("candidates") else "—"
-                ),
-                "Votes": w.get("winner_votes", 0) or (
-                    w["candidates"][0]["votes"] if w.get("candidates") else 0
-                ),
-                "Vote %": w.get("vote_pct", 0),
-                "Margin": w.get("margin", 0),
-                "Turnout %": w.get("turnout", 0),
-                "EVM %": w.get("evm_processed", 0),
-                "Counted %": w.get("votes_counted_pct", 0),
-                "Category": w.get("category", "—"),
-                "Gender": w.get("gender", "—"),
-                "candidates": w.get("candidates", []),
-            }
-            rows.append(row)
-    return pd.DataFrame(rows)
+    source = DataSource.from_env([data_path]).register_gauges()
+    # Project each new version on the fetcher thread, not on a page render
+    source.subscribe(lambda old, new: projection.project(new))
+    return source.start()
+
+
+def load_snapshot() -> Snapshot:
+    """
+    Return the shared results snapshot. Never fetches on the session's
+    thread; the snapshot only changes when the data version changes, so
+    every page and session reuses the same flattened table and aggregates.
+    """
+    return get_source().get()
 
 
 # ---------------------------------------------------------------------------
@@ -302,18 +285,250 @@ def metric_card(label: str, value, color: str = SAFFRON) -> str:
     </div>"""
 
 
-def status_badge(status: str) -> str:
-    cls = "badge-declared" if status == "Declared" else "badge-counting"
-    return f'<span class="{cls}">{status}</span>'
+WARD_TABLE = render.TableSpec("app-wards", [
+    ("Ward No.", "Ward No.", render.text),
+    ("Ward Name", "Ward Name", render.text),
+    ("Status", "Status", render.status_badge()),
+    ("Winner/Leading", "Winner/Leading", render.strong),
+    ("Party", "Party", render.party(PARTY_COLORS)),
+    ("Votes", "Votes", render.thousands),
+    ("Vote %", "Vote %", render.percent),
+    ("Margin", "Margin", render.thousands),
+    ("Turnout %", "Turnout %", render.percent),
+], open_tag='<table class="ward-table" role="table" aria-label="Ward results">')
+
+
+# ---------------------------------------------------------------------------
+# Cached figures
+# ---------------------------------------------------------------------------
+# Figures depend only on the data version and the theme, so they are built
+# once per (version, theme) and shared by every session and rerun. The
+# snapshot argument is underscored so Streamlit does not hash it.
+
+@st.cache_resource(max_entries=4)
+def home_figures(version: str, dark_mode: bool, _snap: Snapshot) -> dict:
+    """Seat share pie and bar for the home page."""
+    metrics.inc("figure_builds", page="home")
+    template = "plotly_dark" if dark_mode else "plotly"
+    party_seats = pd.DataFrame(list(_snap.party_seats.items()), columns=["Party", "Seats"])
+
+    fig_pie = px.pie(
+        party_seats, names="Party", values="Seats",
+        color="Party",
+        color_discrete_map=PARTY_COLORS,
+        hole=0.45,
+        template=template,
+    )
+    fig_pie.update_layout(
+        margin=dict(t=30, b=10, l=10, r=10),
+        legend=dict(orientation="h", y=-0.15),
+        font=dict(size=13),
+    )
+    fig_pie.update_traces(textinfo="label+value+percent", textfont_size=12)
+
+    fig_bar = px.bar(
+        party_seats.sort_values("Seats", ascending=True),
+        x="Seats", y="Party", orientation="h",
+        color="Party",
+        color_discrete_map=PARTY_COLORS,
+        text="Seats",
+        template=template,
+    )
+    fig_bar.update_layout(
+        margin=dict(t=30, b=10, l=10, r=10),
+        showlegend=False,
+        yaxis_title="", xaxis_title="Seats Won",
+        font=dict(size=13),
+    )
+    fig_bar.update_traces(textposition="outside")
+
+    figs = {"seat_pie": fig_pie, "seat_bar": fig_bar}
+    seats = projection.project(_snap).seats
+    if seats["Leading"].sum():
+        fig_proj = px.bar(
+            seats, x="Party", y="Projected",
+            color="Party", color_discrete_map=PARTY_COLORS,
+            error_y=seats["High"] - seats["Projected"],
+            error_y_minus=seats["Projected"] - seats["Low"],
+            text="Projected",
+            hover_data=["Won", "Leading", "Low", "High"],
+            template=template,
+        )
+        fig_proj.update_layout(
+            showlegend=False,
+            margin=dict(t=30, b=10),
+            yaxis_title="Projected Seats", xaxis_title="",
+            font=dict(size=13),
+        )
+        fig_proj.update_traces(texttemplate="%{text:.0f}", textposition="inside")
+        figs["projection"] = fig_proj
+    return figs
+
+
+@st.cache_resource(max_entries=4)
+def analytics_figures(version: str, dark_mode: bool, _snap: Snapshot) -> dict:
+    """All charts on the State Analytics page."""
+    metrics.inc("figure_builds", page="analytics")
+    template = "plotly_dark" if dark_mode else "plotly"
+    df = _snap.frame
+    declared = df[df["Status"] == "Declared"]
+
+    party_seats = pd.DataFrame(list(_snap.party_seats.items()), columns=["Party", "Seats"])
+    fig = px.bar(
+        party_seats, x="Party", y="Seats",
+        color="Party", color_discrete_map=PARTY_COLORS,
+        text="Seats",
+        template=template,
+    )
+    fig.update_layout(
+        showlegend=False,
+        margin=dict(t=30, b=10),
+        yaxis_title="Seats Won",
+        xaxis_title="",
+    )
+    fig.update_traces(textposition="outside")
+
+    cross = declared.groupby(["Municipality", "Party"], observed=True).size().reset_index(name="Seats")
+    fig2 = px.bar(
+        cross, x="Municipality", y="Seats", color="Party",
+        color_discrete_map=PARTY_COLORS,
+        barmode="stack",
+        template=template,
+    )
+    fig2.update_layout(
+        xaxis_tickangle=-35,
+        margin=dict(t=30, b=80),
+        legend=dict(orientation="h", y=-0.35),
+        height=450,
+    )
+
+    top10 = df.nlargest(10, "Turnout %")[
+        ["Municipality", "Ward Name", "Winner/Leading", "Party", "Turnout %"]
+    ]
+    fig3 = px.bar(
+        top10, x="Turnout %", y="Ward Name", orientation="h",
+        color="Municipality",
+        text="Turnout %",
+        hover_data=["Winner/Leading", "Party"],
+        template=template,
+    )
+    fig3.update_layout(
+        yaxis=dict(autorange="reversed"),
+        margin=dict(t=30, b=10, l=10, r=10),
+        height=400,
+        legend=dict(orientation="h", y=-0.25),
+    )
+    fig3.update_traces(texttemplate="%{text:.1f}%", textposition="outside")
+
+    gender_data = declared["Gender"].value_counts().loc[lambda s: s > 0].reset_index()
+    gender_data.columns = ["Gender", "Count"]
+    fig_g = px.pie(gender_data, names="Gender", values="Count", hole=0.4,
+                   color_discrete_sequence=[SAFFRON, GREEN, NAVY], template=template)
+    fig_g.update_layout(margin=dict(t=30, b=10))
+
+    cat_data = declared["Category"].value_counts().loc[lambda s: s > 0].reset_index()
+    cat_data.columns = ["Category", "Count"]
+    fig_c = px.pie(cat_data, names="Category", values="Count", hole=0.4,
+                   color_discrete_sequence=["#FF9933", "#138808", "#19AAED", "#9C27B0", "#757575"],
+                   template=template)
+    fig_c.update_layout(margin=dict(t=30, b=10))
+
+    fig_m = px.histogram(
+        declared, x="Margin", nbins=20,
+        color_discrete_sequence=[SAFFRON],
+        labels={"Margin": "Victory Margin (votes)"},
+        template=template,
+    )
+    fig_m.update_layout(
+        margin=dict(t=30, b=10),
+        yaxis_title="Number of Wards",
+    )
+
+    shares = swing.report(_snap).shares["state"]
+    fig_s = px.bar(
+        shares, x="Party", y="Swing",
+        color="Party", color_discrete_map=PARTY_COLORS,
+        text="Swing",
+        hover_data=["Vote %", "Prev Vote %", "Gained", "Lost"],
+        template=template,
+    )
+    fig_s.update_layout(
+        showlegend=False,
+        margin=dict(t=30, b=10),
+        yaxis_title="Swing (% points)",
+        xaxis_title="",
+    )
+    fig_s.update_traces(texttemplate="%{text:+.2f}", textposition="outside")
+
+    return {
+        "party_seats": fig,
+        "muni_breakdown": fig2,
+        "top_turnout": fig3,
+        "gender": fig_g,
+        "category": fig_c,
+        "margins": fig_m,
+        "swing": fig_s,
+    }
+
+
+def _change_style(change: pd.Series) -> np.ndarray:
+    return np.select(
+        [change > 0, change < 0],
+        ["color: green; font-weight:700", "color: red; font-weight:700"],
+        "",
+    )
+
+
+@st.cache_resource(max_entries=256)
+def ward_detail_figures(version: str, ward_id: int, _snap: Snapshot):
+    """
+    Candidate table and vote comparison chart for one ward, from its
+    slice of the candidate table. Cached per (version, ward) so flipping
+    through wards only builds each one once. The table is styled per call
+    (see styled_candidates): a Styler keeps render state and must not be
+    shared between sessions.
+    """
+    metrics.inc("figure_builds", page="ward")
+    candidates = _snap.ward_candidates(ward_id)
+    votes = candidates["Votes"]
+    parties = candidates["Party"].astype(str)
+    cdf = pd.DataFrame({
+        "Name": candidates["Name"],
+        "Party": parties,
+        "Votes": votes,
+        "Vote %": candidates["Vote %"],
+        # Swing vs the previous election; first-time wards show 0
+        "Change": (votes - candidates["Prev Votes"].fillna(votes)).astype("int64"),
+    })
+    fig = go.Figure(go.Bar(
+        x=cdf["Name"],
+        y=votes,
+        marker_color=parties.map(PARTY_COLORS).fillna("#999"),
+        text=votes.map("{:,}".format),
+        textposition="outside",
+    ))
+    fig.update_layout(
+        title="Candidate Vote Comparison",
+        yaxis_title="Votes",
+        showlegend=False,
+        margin=dict(t=40, b=10, l=10, r=10),
+        height=350,
+    )
+    return cdf, fig
+
+
+def styled_candidates(cdf: pd.DataFrame):
+    """The candidate table with gains in green and losses in red."""
+    return cdf.style.apply(_change_style, subset=["Change"])
 
 
 # ---------------------------------------------------------------------------
 # PAGES
 # ---------------------------------------------------------------------------
 
-def page_home(data: dict, df: pd.DataFrame):
+def page_home(snap: Snapshot):
     """Dashboard Home – state-level overview."""
-    summary = data["summary"]
+    summary = snap.summary
 
     st.markdown("""
     <div class="main-header">
@@ -326,8 +541,8 @@ def page_home(data: dict, df: pd.DataFrame):
     cards = [
         ("Total ULBs", summary["total_ulbs"], SAFFRON),
         ("Total Wards", summary["total_wards"], NAVY),
-        ("Results Declared", f"{len(df[df['Status']=='Declared'])}/{len(df)}", GREEN),
-        ("Avg. Turnout", f"{df['Turnout %'].mean():.1f}%", "#19AAED"),
+        ("Results Declared", f"{snap.declared_count}/{len(snap.wards)}", GREEN),
+        ("Avg. Turnout", f"{snap.avg_turnout:.1f}%", "#19AAED"),
     ]
     for col, (label, val, clr) in zip(cols, cards):
         col.markdown(metric_card(label, val, clr), unsafe_allow_html=True)
@@ -340,7 +555,7 @@ def page_home(data: dict, df: pd.DataFrame):
     
     # Parse the data timestamp and format it properly
     try:
-        data_time = datetime.fromisoformat(data["last_updated"].replace("T", " "))
+        data_time = datetime.fromisoformat(snap.last_updated.replace("T", " "))
         ts = data_time.strftime("%d %b %Y, %H:%M")
     except:
         ts = datetime.now().strftime("%d %b %Y, %H:%M")
@@ -355,70 +570,47 @@ def page_home(data: dict, df: pd.DataFrame):
 
     # Party-wise seat share
     st.subheader("Party-wise Seat Share (Declared Wards)")
-    declared = df[df["Status"] == "Declared"]
-    party_seats = declared["Party"].value_counts().reset_index()
-    party_seats.columns = ["Party", "Seats"]
-    party_seats["Color"] = party_seats["Party"].map(PARTY_COLORS).fillna("#999")
+    with metrics.timer("figures", page="home"):
+        figs = home_figures(snap.version, st.session_state.get("dark_mode", False), snap)
 
     c1, c2 = st.columns(2)
     with c1:
-        fig_pie = px.pie(
-            party_seats, names="Party", values="Seats",
-            color="Party",
-            color_discrete_map=PARTY_COLORS,
-            hole=0.45,
-        )
-        fig_pie.update_layout(
-            margin=dict(t=30, b=10, l=10, r=10),
-            legend=dict(orientation="h", y=-0.15),
-            font=dict(size=13),
-        )
-        fig_pie.update_traces(textinfo="label+value+percent", textfont_size=12)
-        st.plotly_chart(fig_pie, use_container_width=True)
+        st.plotly_chart(figs["seat_pie"], use_container_width=True)
 
     with c2:
-        fig_bar = px.bar(
-            party_seats.sort_values("Seats", ascending=True),
-            x="Seats", y="Party", orientation="h",
-            color="Party",
-            color_discrete_map=PARTY_COLORS,
-            text="Seats",
-        )
-        fig_bar.update_layout(
-            margin=dict(t=30, b=10, l=10, r=10),
-            showlegend=False,
-            yaxis_title="", xaxis_title="Seats Won",
-            font=dict(size=13),
-        )
-        fig_bar.update_traces(textposition="outside")
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(figs["seat_bar"], use_container_width=True)
 
     # Leading party projection
-    if not party_seats.empty:
-        leader = party_seats.iloc[0]
+    if snap.party_seats:
+        party, seats = next(iter(snap.party_seats.items()))
         st.success(
-            f"**Leading Party:** {leader['Party']} with "
-            f"**{leader['Seats']}** seats declared so far"
+            f"**Leading Party:** {party} with "
+            f"**{seats}** seats declared so far"
+        )
+
+    # Projected final seats from the wards still counting
+    if "projection" in figs:
+        st.subheader("Projected Seats (Declared + Counting)")
+        proj = projection.project(snap)
+        st.plotly_chart(figs["projection"], use_container_width=True)
+        st.caption(
+            "Declared seats plus each party's chance of winning the wards still "
+            "counting, simulated from the votes counted so far; bars show a 90% range."
         )
+        with st.expander("Projection by municipality and closest races"):
+            muni = st.selectbox("Municipality", list(snap.muni_by_name), key="proj_muni")
+            st.dataframe(proj.by_muni[proj.by_muni["Municipality"] == muni].drop(columns="Municipality"),
+                         use_container_width=True, hide_index=True)
+            st.markdown("**Closest counting wards**")
+            st.dataframe(proj.wards.head(10), use_container_width=True, hide_index=True)
 
     st.divider()
 
     # Municipality summary with clickable cards
     st.subheader("Municipality-wise Summary")
     st.markdown("*Click on any municipality below to view detailed ward results*")
-    
-    muni_summary = []
-    for m in data["municipalities"]:
-        wards = m.get("wards", [])
-        dec = sum(1 for w in wards if w["status"] == "Declared")
-        muni_summary.append({
-            "name": m["name"],
-            "type": m.get("type", ""),
-            "total_wards": m["total_wards"],
-            "declared": dec,
-            "progress": f"{dec}/{m['total_wards']}",
-            "pct_complete": round(dec / m["total_wards"] * 100, 1) if m["total_wards"] else 0,
-        })
+
+    muni_summary = snap.muni_progress
     
     # Create clickable municipality cards in a grid
     cols_per_row = 3
@@ -465,7 +657,7 @@ def page_home(data: dict, df: pd.DataFrame):
     )
 
 
-def page_municipality(data: dict, df: pd.DataFrame):
+def page_municipality(snap: Snapshot):
     """Municipality-wise ward results with search, sort, and detail."""
     st.markdown("""
     <div class="main-header">
@@ -473,7 +665,7 @@ def page_municipality(data: dict, df: pd.DataFrame):
         <p>Select a municipality to view ward-level details</p>
     </div>""", unsafe_allow_html=True)
 
-    muni_names = [m["name"] for m in data["municipalities"]]
+    muni_names = list(snap.muni_by_name)
     
     # Check if municipality was selected from home page
     default_idx = 0
@@ -492,8 +684,8 @@ def page_municipality(data: dict, df: pd.DataFrame):
         key="muni_select"
     )
 
-    muni_data = next(m for m in data["municipalities"] if m["name"] == selected)
-    mdf = df[df["Municipality"] == selected].copy()
+    muni_data = snap.muni_by_name[selected]
+    mdf = snap.muni_frame(selected)
 
     # Mayor race info if available
     if "mayor_race" in muni_data and muni_data["mayor_race"]:
@@ -507,7 +699,7 @@ def page_municipality(data: dict, df: pd.DataFrame):
     # Quick stats
     c1, c2, c3, c4 = st.columns(4)
     total_w = muni_data["total_wards"]
-    dec = len(mdf[mdf["Status"] == "Declared"])
+    dec = snap.declared_by_muni[selected]
     c1.metric("Total Wards", total_w)
     c2.metric("Declared", dec)
     c3.metric("Counting", total_w - dec)
@@ -518,119 +710,97 @@ def page_municipality(data: dict, df: pd.DataFrame):
     # Search / filter
     search = st.text_input("🔍 Search by ward name or candidate", "", key="ward_search")
     if search:
-        mask = (
-            mdf["Ward Name"].str.contains(search, case=False, na=False) |
-            mdf["Winner/Leading"].str.contains(search, case=False, na=False)
-        )
-        mdf = mdf[mask]
-
-    # Build HTML table for full control
-    table_html = '<table class="ward-table" role="table" aria-label="Ward results"><thead><tr>'
-    headers = ["Ward No.", "Ward Name", "Status", "Winner/Leading", "Party",
-               "Votes", "Vote %", "Margin", "Turnout %"]
-    for h in headers:
-        table_html += f"<th>{h}</th>"
-    table_html += "</tr></thead><tbody>"
-
-    for _, row in mdf.sort_values("Ward No.").iterrows():
-        table_html += "<tr>"
-        table_html += f"<td>{row['Ward No.']}</td>"
-        table_html += f"<td>{row['Ward Name']}</td>"
-        table_html += f"<td>{status_badge(row['Status'])}</td>"
-        table_html += f"<td><strong>{row['Winner/Leading']}</strong></td>"
-        party = row["Party"]
-        pc = PARTY_COLORS.get(party, "#999")
-        table_html += f'<td><span style="color:{pc};font-weight:700">{party}</span></td>'
-        table_html += f"<td>{row['Votes']:,}</td>"
-        table_html += f"<td>{row['Vote %']:.1f}%</td>"
-        table_html += f"<td>{row['Margin']:,}</td>"
-        table_html += f"<td>{row['Turnout %']:.1f}%</td>"
-        table_html += "</tr>"
-    table_html += "</tbody></table>"
-
+        # Matches any candidate, not just the leader, in Hindi or Latin spelling
+        ids = snap.muni_ward_ids[selected]
+        hits = name_search.get_index(snap).search(search, min(ids), max(ids) + 1) if ids else {}
+        mdf = mdf[mdf.index.isin(list(hits))]
+        found = [
+            f"{snap.wards[i].candidates[pos].name} (Ward {snap.wards[i].ward_no})"
+            for i in mdf.index for pos in hits[i]
+        ]
+        if found:
+            st.caption("Candidates: " + ", ".join(found))
+
+    # Build HTML table for full control (rows cached per data version)
+    table_html = render.ward_table(WARD_TABLE, snap, selected, mdf.index if search else None)
     st.markdown(table_html, unsafe_allow_html=True)
 
     st.markdown("<br>", unsafe_allow_html=True)
 
     # Ward detail expander
     st.subheader("Ward Detail View")
-    ward_options = mdf.sort_values("Ward No.").apply(
-        lambda r: f"Ward {r['Ward No.']} – {r['Ward Name']}", axis=1
-    ).tolist()
-    if ward_options:
-        chosen = st.selectbox("Select Ward for Details", ward_options, key="ward_detail")
-        ward_no = int(chosen.split("–")[0].replace("Ward", "").strip())
-        show_ward_detail(mdf, ward_no)
+    ward_ids = mdf.index.tolist()
+    if ward_ids:
+        ward_id = st.selectbox(
+            "Select Ward for Details", ward_ids, key="ward_detail",
+            format_func=lambda i: f"Ward {snap.wards[i].ward_no} – {snap.wards[i].ward_name}",
+        )
+        show_ward_detail(snap, ward_id)
 
 
-def show_ward_detail(mdf: pd.DataFrame, ward_no: int):
+def show_ward_detail(snap: Snapshot, ward_id: int):
     """Render detailed candidate-level results for a ward."""
-    row = mdf[mdf["Ward No."] == ward_no].iloc[0]
-    candidates = row["candidates"]
+    row = snap.wards[ward_id]
 
     # Winner card
     st.markdown(f"""
     <div class="winner-card">
-        <h3>{"🏆 Winner" if row["Status"] == "Declared" else "📊 Leading"}: {row["Winner/Leading"]}</h3>
-        <p><strong>Party:</strong> {row["Party"]} &nbsp;|&nbsp;
-           <strong>Votes:</strong> {row["Votes"]:,} &nbsp;|&nbsp;
-           <strong>Margin:</strong> {row["Margin"]:,}</p>
+        <h3>{"🏆 Winner" if row.status == "Declared" else "📊 Leading"}: {row.leader}</h3>
+        <p><strong>Party:</strong> {row.party} &nbsp;|&nbsp;
+           <strong>Votes:</strong> {row.votes:,} &nbsp;|&nbsp;
+           <strong>Margin:</strong> {row.margin:,}</p>
     </div>""", unsafe_allow_html=True)
 
     # Progress bars
     c1, c2 = st.columns(2)
     with c1:
         st.markdown("**Votes Counted**")
-        st.progress(min(row["Counted %"] / 100, 1.0))
-        st.caption(f"{row['Counted %']:.0f}% counted")
+        st.progress(min(row.counted_pct / 100, 1.0))
+        st.caption(f"{row.counted_pct:.0f}% counted")
     with c2:
         st.markdown("**EVMs Processed**")
-        st.progress(min(row["EVM %"] / 100, 1.0))
-        st.caption(f"{row['EVM %']:.0f}% processed")
+        st.progress(min(row.evm_pct / 100, 1.0))
+        st.caption(f"{row.evm_pct:.0f}% processed")
 
     # Candidate table
-    if candidates:
-        cdf = pd.DataFrame(candidates)
-        cdf["Change"] = cdf.apply(
-            lambda r: r["votes"] - r.get("prev_votes", r["votes"]), axis=1
-        )
-        cdf.columns = [c.title() for c in cdf.columns]
-        cdf = cdf.rename(columns={"Pct": "Vote %", "Prev_Votes": "Prev Votes"})
-
+    if row.candidates:
+        cdf, fig = ward_detail_figures(snap.version, ward_id, snap)
         st.markdown("**All Candidates**")
-        st.dataframe(
-            cdf[["Name", "Party", "Votes", "Vote %", "Change"]].style.applymap(
-                lambda v: "color: green; font-weight:700" if isinstance(v, (int, float)) and v > 0
-                else ("color: red; font-weight:700" if isinstance(v, (int, float)) and v < 0 else ""),
-                subset=["Change"],
-            ),
-            use_container_width=True,
-            hide_index=True,
-        )
-
-        # Vote trend chart
-        fig = go.Figure()
-        for _, c in cdf.iterrows():
-            clr = PARTY_COLORS.get(c["Party"], "#999")
-            fig.add_trace(go.Bar(
-                x=[c["Name"]],
-                y=[c["Votes"]],
-                name=c["Name"],
-                marker_color=clr,
-                text=[f"{c['Votes']:,}"],
-                textposition="outside",
-            ))
-        fig.update_layout(
-            title="Candidate Vote Comparison",
-            yaxis_title="Votes",
-            showlegend=False,
-            margin=dict(t=40, b=10, l=10, r=10),
-            height=350,
-        )
+        st.dataframe(styled_candidates(cdf), use_container_width=True, hide_index=True)
         st.plotly_chart(fig, use_container_width=True)
 
 
-def page_analytics(data: dict, df: pd.DataFrame):
+EXPORT_BUTTONS = [
+    ("Download CSV", "csv"),
+    ("Download Excel", "excel"),
+    ("Download Parquet", "parquet"),
+    ("Candidates CSV", "candidates"),
+]
+
+# Streamlit >= 1.50 accepts a callable for download data and only runs it
+# when the button is clicked; older versions need the bytes up front.
+try:
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    DEFERRED_DOWNLOADS = hasattr(MediaFileManager, "add_deferred")
+except ImportError:
+    DEFERRED_DOWNLOADS = False
+
+
+def export_button(snap: Snapshot, label: str, kind: str):
+    """A download button whose file is only built when someone asks for it."""
+    _, file_name, mime, module = exports.FORMATS[kind]
+    if not exports.available(kind):
+        st.caption(f"Install {module} for {label.split()[-1]} export: pip install {module}")
+        return
+    if DEFERRED_DOWNLOADS:
+        st.download_button(label, data=lambda: exports.export(snap, kind),
+                           file_name=file_name, mime=mime, key=f"dl_{kind}")
+    elif exports.is_cached(snap, kind) or st.button(f"Prepare {label.split()[-1]}", key=f"prep_{kind}"):
+        st.download_button(label, data=exports.export(snap, kind),
+                           file_name=file_name, mime=mime, key=f"dl_{kind}")
+
+
+def page_analytics(snap: Snapshot):
     """State Summary Analytics with charts and download."""
     st.markdown("""
     <div class="main-header">
@@ -638,130 +808,70 @@ def page_analytics(data: dict, df: pd.DataFrame):
         <p>Comprehensive analysis across all municipalities</p>
     </div>""", unsafe_allow_html=True)
 
-    declared = df[df["Status"] == "Declared"]
+    with metrics.timer("figures", page="analytics"):
+        figs = analytics_figures(snap.version, st.session_state.get("dark_mode", False), snap)
 
     # Party-wise total seats across all municipalities
     st.subheader("Party-wise Seats Won – All Municipalities")
-    party_seats = declared["Party"].value_counts().reset_index()
-    party_seats.columns = ["Party", "Seats"]
-    fig = px.bar(
-        party_seats, x="Party", y="Seats",
-        color="Party", color_discrete_map=PARTY_COLORS,
-        text="Seats",
-    )
-    fig.update_layout(
-        showlegend=False,
-        margin=dict(t=30, b=10),
-        yaxis_title="Seats Won",
-        xaxis_title="",
-    )
-    fig.update_traces(textposition="outside")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figs["party_seats"], use_container_width=True)
 
     st.divider()
 
     # Municipality-wise party breakdown
     st.subheader("Municipality-wise Party Breakdown")
-    cross = declared.groupby(["Municipality", "Party"]).size().reset_index(name="Seats")
-    fig2 = px.bar(
-        cross, x="Municipality", y="Seats", color="Party",
-        color_discrete_map=PARTY_COLORS,
-        barmode="stack",
-    )
-    fig2.update_layout(
-        xaxis_tickangle=-35,
-        margin=dict(t=30, b=80),
-        legend=dict(orientation="h", y=-0.35),
-        height=450,
-    )
-    st.plotly_chart(fig2, use_container_width=True)
+    st.plotly_chart(figs["muni_breakdown"], use_container_width=True)
 
     st.divider()
 
     # Top 10 highest turnout wards
     st.subheader("Top 10 Highest Turnout Wards")
-    top10 = df.nlargest(10, "Turnout %")[
-        ["Municipality", "Ward Name", "Winner/Leading", "Party", "Turnout %"]
-    ]
-    fig3 = px.bar(
-        top10, x="Turnout %", y="Ward Name", orientation="h",
-        color="Municipality",
-        text="Turnout %",
-        hover_data=["Winner/Leading", "Party"],
-    )
-    fig3.update_layout(
-        yaxis=dict(autorange="reversed"),
-        margin=dict(t=30, b=10, l=10, r=10),
-        height=400,
-        legend=dict(orientation="h", y=-0.25),
-    )
-    fig3.update_traces(texttemplate="%{text:.1f}%", textposition="outside")
-    st.plotly_chart(fig3, use_container_width=True)
+    st.plotly_chart(figs["top_turnout"], use_container_width=True)
 
     st.divider()
 
     # Gender-wise summary
     st.subheader("Gender-wise Winners")
     c1, c2 = st.columns(2)
-    gender_data = declared["Gender"].value_counts().reset_index()
-    gender_data.columns = ["Gender", "Count"]
     with c1:
-        fig_g = px.pie(gender_data, names="Gender", values="Count", hole=0.4,
-                       color_discrete_sequence=[SAFFRON, GREEN, NAVY])
-        fig_g.update_layout(margin=dict(t=30, b=10))
-        st.plotly_chart(fig_g, use_container_width=True)
+        st.plotly_chart(figs["gender"], use_container_width=True)
 
     # Category-wise summary (SC/ST/OBC/General)
-    cat_data = declared["Category"].value_counts().reset_index()
-    cat_data.columns = ["Category", "Count"]
     with c2:
-        fig_c = px.pie(cat_data, names="Category", values="Count", hole=0.4,
-                       color_discrete_sequence=["#FF9933", "#138808", "#19AAED", "#9C27B0", "#757575"])
-        fig_c.update_layout(margin=dict(t=30, b=10))
-        st.plotly_chart(fig_c, use_container_width=True)
+        st.plotly_chart(figs["category"], use_container_width=True)
 
     st.divider()
 
     # Margin analysis
     st.subheader("Victory Margin Distribution")
-    fig_m = px.histogram(
-        declared, x="Margin", nbins=20,
-        color_discrete_sequence=[SAFFRON],
-        labels={"Margin": "Victory Margin (votes)"},
-    )
-    fig_m.update_layout(
-        margin=dict(t=30, b=10),
-        yaxis_title="Number of Wards",
+    st.plotly_chart(figs["margins"], use_container_width=True)
+
+    st.divider()
+
+    # Vote share and swing vs the previous election (one report per data version)
+    st.subheader("Vote Share & Swing vs Previous Election")
+    report = swing.report(snap)
+    state_flips = report.flips["state"].iloc[0]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Declared Wards Compared", int(state_flips["Compared"]))
+    c2.metric("Seats Changed Hands", int(state_flips["Flipped"]))
+    c3.metric("Flip Rate", "—" if pd.isna(state_flips["Flip %"]) else f"{state_flips['Flip %']:.1f}%")
+    st.plotly_chart(figs["swing"], use_container_width=True)
+
+    level = st.radio(
+        "Break down by", ["municipality", "category", "gender"],
+        format_func=str.title, horizontal=True, key="swing_level",
     )
-    st.plotly_chart(fig_m, use_container_width=True)
+    st.dataframe(report.shares[level], use_container_width=True, hide_index=True)
+    st.markdown("**Seat flips**")
+    st.dataframe(report.flips[level], use_container_width=True, hide_index=True)
 
     st.divider()
 
-    # Download section
+    # Download section: files are built on first click, once per data version
     st.subheader("📥 Download Data")
-    c1, c2 = st.columns(2)
-    export_df = df.drop(columns=["candidates"])
-    with c1:
-        csv = export_df.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            "Download CSV",
-            data=csv,
-            file_name="jharkhand_election_results_2026.csv",
-            mime="text/csv",
-        )
-    with c2:
-        try:
-            from io import BytesIO
-            buf = BytesIO()
-            export_df.to_excel(buf, index=False, engine="openpyxl")
-            st.download_button(
-                "Download Excel",
-                data=buf.getvalue(),
-                file_name="jharkhand_election_results_2026.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-        except ImportError:
-            st.info("Install openpyxl for Excel export: pip install openpyxl")
+    for col, (label, kind) in zip(st.columns(len(EXPORT_BUTTONS)), EXPORT_BUTTONS):
+        with col:
+            export_button(snap, label, kind)
 
 
 # ---------------------------------------------------------------------------
@@ -804,14 +914,14 @@ def render_sidebar():
         # Settings
         st.markdown("### ⚙️ Settings")
         dark_mode = st.toggle("🌙 Dark Mode", value=False, key="dark_mode")
-        auto = st.toggle("🔄 Auto-refresh (15s)", value=True, key="auto_refresh")
+        auto = st.toggle(f"🔄 Auto-refresh ({REFRESH_SECONDS}s)", value=True, key="auto_refresh")
 
         # Live status indicator
         if auto:
             st.markdown("""
             <div style='text-align: center; padding: 10px; background: #d4edda; border-radius: 5px; margin: 10px 0;'>
                 <span style='color: #155724; font-size: 0.8rem;'>
-                    🟢 LIVE - Auto-updating every 15s
+                    🟢 LIVE - Updates as soon as new results arrive
                 </span>
             </div>
             """, unsafe_allow_html=True)
@@ -830,6 +940,57 @@ def render_sidebar():
     return page, dark_mode, auto
 
 
+def debug_enabled() -> bool:
+    # Server-side only: the panel can reset the process-wide metrics, so a
+    # visitor must not be able to switch it on from the URL
+    return metrics.ENABLED and os.getenv("ELECTION_DEBUG") == "1"
+
+
+def render_debug_panel(snap: Snapshot):
+    """Process-wide counters and timers, for checking caches and timings live."""
+    source = get_source()
+    data = metrics.collect()
+    with st.sidebar.expander("🛠️ Debug metrics", expanded=False):
+        st.caption(f"Data version `{snap.version}`")
+        gauges = data["gauges"]
+        cols = st.columns(2)
+        if "data_age_seconds" in gauges:
+            cols[0].metric("Data age", f"{gauges['data_age_seconds'] / 60:,.0f} min")
+        if "data_loaded_age_seconds" in gauges:
+            cols[1].metric("Loaded", f"{gauges['data_loaded_age_seconds']:,.0f} s ago")
+        if source.error:
+            st.warning(source.error)
+
+        counters = [
+            {"Counter": name, "Labels": ", ".join(f"{k}={v}" for k, v in labels), "Value": value}
+            for (name, labels), value in sorted(data["counters"].items())
+        ]
+        if counters:
+            st.dataframe(pd.DataFrame(counters), hide_index=True, use_container_width=True)
+
+        timers = [
+            {
+                "Timer": name,
+                "Labels": ", ".join(f"{k}={v}" for k, v in labels),
+                "Count": count,
+                "Mean ms": total / count * 1000,
+                "Max ms": peak * 1000,
+            }
+            for (name, labels), (count, total, peak) in sorted(data["timers"].items())
+        ]
+        if timers:
+            st.dataframe(
+                pd.DataFrame(timers), hide_index=True, use_container_width=True,
+                column_config={
+                    "Mean ms": st.column_config.NumberColumn(format="%.2f"),
+                    "Max ms": st.column_config.NumberColumn(format="%.2f"),
+                },
+            )
+        if st.button("Reset metrics", key="debug_reset"):
+            metrics.reset()
+            st.rerun()
+
+
 # ---------------------------------------------------------------------------
 # Footer
 # ---------------------------------------------------------------------------
@@ -844,6 +1005,21 @@ def render_footer():
     </div>""", unsafe_allow_html=True)
 
 
+# ---------------------------------------------------------------------------
+# Auto-refresh
+# ---------------------------------------------------------------------------
+@st.fragment(run_every=REFRESH_SECONDS)
+def watch_for_updates(version: str):
+    """
+    Check the data version on a timer and rerun the whole app only when it
+    has changed. The timer runs in the browser, so no script thread is left
+    sleeping per session and unchanged data never rebuilds the charts.
+    """
+    snap = load_snapshot()
+    if snap is not None and snap.version != version:
+        st.rerun()
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -852,22 +1028,26 @@ def main():
     inject_css(dark_mode)
 
     with st.spinner("Loading election data…"):
-        data = load_data()
-    df = flatten_wards(data)
-
-    if page == "🏠 Dashboard Home":
-        page_home(data, df)
-    elif page == "🏛️ Municipality-wise":
-        page_municipality(data, df)
-    elif page == "📈 State Analytics":
-        page_analytics(data, df)
+        snap = load_snapshot()
+    if snap is None:
+        st.error(f"Results unavailable: {get_source().error or 'still loading'}")
+        st.stop()
+
+    with metrics.timer("page_render", page=page.split(" ", 1)[1]):
+        if page == "🏠 Dashboard Home":
+            page_home(snap)
+        elif page == "🏛️ Municipality-wise":
+            page_municipality(snap)
+        elif page == "📈 State Analytics":
+            page_analytics(snap)
 
     render_footer()
+    if debug_enabled():
+        render_debug_panel(snap)
 
-    # Auto-refresh via st.rerun
+    # Auto-refresh: rerun only when the data version changes
     if auto_refresh:
-        time.sleep(15)
-        st.rerun()
+        watch_for_updates(snap.version)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+"""
+Synthetic Results Generator
+===========================
+Writes a results document in the same schema as data/sample_data.json,
+at any size, for benchmarking:
+
+    python bench/generate.py --ulbs 48 --wards 25 --candidates 6 \
+        --declared 0.4 --seed 1 -o /tmp/state.json
+
+Wards per ULB and candidates per ward vary around the given means. Vote
+counts, margins and percentages are consistent within each ward, and
+counting wards carry partial counts with an empty winner, as in the live
+feed. The same seed always produces the same document.
+"""
+
+import argparse
+import json
+import random
+import sys
+
+ULB_TYPES = [
+    ("Municipal Corporation", "mayor_race"),
+    ("Nagar Nigam", None),
+    ("Nagar Parishad", "president_race"),
+    ("Nagar Panchayat", "chairman_race"),
+]
+TOWNS = [
+    "Ranchi", "Dhanbad", "Bokaro", "Deoghar", "Hazaribagh", "Giridih", "Ramgarh",
+    "Medininagar", "Chas", "Phusro", "Jhumri Telaiya", "Chaibasa", "Dumka", "Sahibganj",
+    "Gumla", "Lohardaga", "Simdega", "Khunti", "Latehar", "Garhwa", "Chatra", "Koderma",
+    "Pakur", "Godda", "Jamtara", "Madhupur", "Basukinath", "Jugsalai", "Mihijam", "Rajmahal",
+    "Barharwa", "Bundu", "Seraikela", "Chakradharpur", "Chirkunda", "Bishrampur", "Hussainabad",
+    "Majhiaon", "Domchanch", "Barki Saraiya", "Kodarma", "Mahagama", "Nagar Untari", "Manjhiaon",
+    "Kapali", "Adityapur", "Mango", "Jamshedpur",
+]
+LOCALITIES = [
+    "Doranda", "Bariatu", "Kanke", "Lalpur", "Hinoo", "Harmu", "Kokar", "Morabadi", "Ratu",
+    "Hatia", "Dhurwa", "Chutia", "Bazar", "Station Road", "Civil Lines", "Kadma", "Sakchi",
+    "Bistupur", "Sonari", "Telco", "Bhuli", "Hirapur", "Saraidhela", "Court Road", "Old Town",
+]
+FIRST_NAMES = [
+    "Savita", "Ramesh", "Dinesh", "Sunil", "Amit", "Sunita", "Rakesh", "Deepak", "Roshni",
+    "Rama", "Anita", "Pooja", "Manoj", "Sanjay", "Priya", "Kavita", "Rajesh", "Mukesh",
+    "Suresh", "Rekha", "Geeta", "Vijay", "Ajay", "Neha", "Umesh", "Pappu", "Shanti", "Birsa",
+]
+LAST_NAMES = [
+    "Kachchhap", "Oraon", "Mahto", "Sahu", "Kumar", "Devi", "Pandey", "Soni", "Khalko",
+    "Munda", "Tirkey", "Ekka", "Singh", "Verma", "Mehta", "Prasad", "Yadav", "Hembrom",
+    "Murmu", "Soren", "Tudu", "Gupta", "Sharma", "Minz", "Lakra", "Toppo",
+]
+PARTIES = [
+    ("JMM", "Jharkhand Mukti Morcha", "#2E7D32", 0.26),
+    ("BJP", "Bharatiya Janata Party", "#FF9933", 0.28),
+    ("INC", "Indian National Congress", "#19AAED", 0.14),
+    ("AJSU", "All Jharkhand Students Union", "#8B0000", 0.08),
+    ("JVM", "Jharkhand Vikas Morcha", "#9C27B0", 0.04),
+    ("IND", "Independent", "#757575", 0.20),
+]
+CATEGORIES = [("General", 0.4), ("OBC", 0.25), ("ST", 0.2), ("SC", 0.15)]
+
+
+def _person(rng) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _weighted(rng, pairs):
+    return rng.choices([p[0] for p in pairs], weights=[p[-1] for p in pairs])[0]
+
+
+def _ward(rng, ward_no: int, n_candidates: int, declared: bool) -> dict:
+    electorate = rng.randint(2500, 9000)
+    turnout = round(rng.uniform(45, 78), 1)
+    counted_pct = 100 if declared else rng.choice([0, 10, 25, 40, 55, 70, 85])
+    polled = int(electorate * turnout / 100 * counted_pct / 100)
+
+    shares = [rng.paretovariate(1.5) for _ in range(n_candidates)]
+    total_share = sum(shares)
+    votes = sorted((int(polled * s / total_share) for s in shares), reverse=True)
+    counted = sum(votes) or 1
+
+    parties = []
+    candidates = []
+    for v in votes:
+        party = _weighted(rng, PARTIES)
+        # one candidate per party, except independents
+        while party in parties and party != "IND":
+            party = _weighted(rng, PARTIES)
+        parties.append(party)
+        c = {"name": _person(rng), "party": party, "votes": v, "pct": round(v / counted * 100, 1)}
+        if rng.random() < 0.9:  # first-time wards have no previous result
+            c["prev_votes"] = max(0, int(v * rng.uniform(0.6, 1.4)))
+        candidates.append(c)
+
+    top = candidates[0]
+    margin = top["votes"] - (candidates[1]["votes"] if len(candidates) > 1 else 0)
+    return {
+        "ward_no": ward_no,
+        "ward_name": f"Ward {ward_no} - {rng.choice(LOCALITIES)}",
+        "status": "Declared" if declared else "Counting",
+        "winner": top["name"] if declared else "",
+        "winner_party": top["party"] if declared else "",
+        "winner_votes": top["votes"] if declared else 0,
+        "vote_pct": top["pct"] if declared else 0,
+        "margin": margin if declared else 0,
+        "turnout": turnout,
+        "evm_processed": counted_pct,
+        "votes_counted_pct": counted_pct,
+        "category": _weighted(rng, CATEGORIES),
+        "gender": rng.choice(["Male", "Female"]),
+        "candidates": candidates,
+    }
+
+
+def _race(rng, declared: bool) -> dict:
+    (lead, lead_party), (trail, trail_party) = (
+        (_person(rng), _weighted(rng, PARTIES)) for _ in range(2)
+    )
+    return {
+        "status": "Declared" if declared else "Counting",
+        "leading": lead,
+        "leading_party": lead_party,
+        "margin": rng.randint(50, 15000),
+        "trailing": trail,
+        "trailing_party": trail_party,
+    }
+
+
+def generate(ulbs: int = 48, wards: int = 25, candidates: int = 5,
+             declared: float = 0.4, seed: int = 0) -> dict:
+    """
+    Build a results document. `wards` and `candidates` are means per ULB
+    and per ward; `declared` is the fraction of declared wards.
+    """
+    rng = random.Random(seed)
+    municipalities = []
+    seats = {p[0]: 0 for p in PARTIES}
+    total_declared = 0
+    total_candidates = 0
+    turnout_sum = 0.0
+    n_wards = 0
+
+    for i in range(ulbs):
+        ulb_type, race = ULB_TYPES[i % len(ULB_TYPES)]
+        town = TOWNS[i % len(TOWNS)]
+        name = f"{town} {ulb_type}" if i < len(TOWNS) else f"{town} {ulb_type} {i // len(TOWNS) + 1}"
+        count = max(1, int(rng.uniform(0.5, 1.5) * wards))
+        ward_list = []
+        dec = 0
+        for ward_no in range(1, count + 1):
+            is_declared = rng.random() < declared
+            n = max(2, int(rng.uniform(0.5, 1.5) * candidates + 0.5))
+            w = _ward(rng, ward_no, n, is_declared)
+            ward_list.append(w)
+            total_candidates += n
+            turnout_sum += w["turnout"]
+            if is_declared:
+                dec += 1
+                seats[w["winner_party"]] += 1
+        n_wards += count
+        total_declared += dec
+
+        muni = {
+            "name": name,
+            "type": ulb_type,
+            "total_wards": count,
+            "declared": dec,
+            "overall_turnout": round(sum(w["turnout"] for w in ward_list) / count, 2),
+        }
+        if race:
+            muni[race] = _race(rng, dec == count)
+        muni["wards"] = ward_list
+        municipalities.append(muni)
+
+    return {
+        "election_name": "Jharkhand Urban Local Body Elections 2026",
+        "last_updated": "2026-02-27T16:55:00",
+        "summary": {
+            "total_ulbs": ulbs,
+            "total_wards": n_wards,
+            "declared": total_declared,
+            "turnout": round(turnout_sum / n_wards, 1) if n_wards else 0,
+            "total_voters": n_wards * 5500,
+            "total_candidates": total_candidates,
+        },
+        "parties": [
+            {"name": p, "full_name": full, "color": color, "seats_won": seats[p]}
+            for p, full, color, _ in PARTIES
+        ],
+        "municipalities": municipalities,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic results document.")
+    parser.add_argument("--ulbs", type=int, default=48, help="number of ULBs (default 48)")
+    parser.add_argument("--wards", type=int, default=25, help="mean wards per ULB (default 25)")
+    parser.add_argument("--candidates", type=int, default=5, help="mean candidates per ward (default 5)")
+    parser.add_argument("--declared", type=float, default=0.4, help="fraction of declared wards (default 0.4)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    doc = generate(args.ulbs, args.wards, args.candidates, args.declared, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False)
+    else:
+        json.dump(doc, sys.stdout, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Benchmark Harness
+=================
+Times the hot paths of the app and the API on a synthetic dataset and
+reports latency percentiles, throughput and peak memory:
+
+    python bench/run.py                        # "state" preset
+    python bench/run.py --preset stress --only api.
+    python bench/run.py --save bench/baselines/state.json
+    python bench/run.py --compare bench/baselines/state.json
+
+Each benchmark is warmed up once, then repeated until --min-time has
+passed (at least --min-reps times). Peak memory is measured in a
+separate, untimed run under tracemalloc so tracing does not skew the
+timings. With --compare, a benchmark whose median is more than
+--threshold slower than the baseline is measured twice more; if the
+best of the three is still too slow it is reported and the exit status
+is 1.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate import generate  # noqa: E402
+
+PRESETS = {
+    # ulbs, mean wards per ULB, mean candidates per ward, declared fraction
+    "sample": dict(ulbs=36, wards=10, candidates=4, declared=0.35),
+    "state": dict(ulbs=48, wards=25, candidates=6, declared=0.4),
+    "stress": dict(ulbs=500, wards=100, candidates=8, declared=0.5),
+}
+
+BENCHMARKS = []  # (name, setup(ctx) -> zero-argument callable)
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+@benchmark("parse.json_loads")
+def _(ctx):
+    raw = ctx["raw"]
+    return lambda: json.loads(raw)
+
+
+@benchmark("parse.stream")
+def _(ctx):
+    from election.stream import load_document
+    raw = ctx["raw"]
+    return lambda: load_document(io.BytesIO(raw))
+
+
+@benchmark("snapshot.build")
+def _(ctx):
+    from election.snapshot import Snapshot
+    data = ctx["data"]
+    return lambda: Snapshot(data)
+
+
+@benchmark("snapshot.load_compiled")
+def _(ctx):
+    import tempfile
+    from election.snapfile import compile_document, load
+    f = tempfile.NamedTemporaryFile(suffix=".snap")
+    f.write(compile_document(ctx["data"], ctx["raw"]))
+    f.flush()
+    ctx["_snapfile"] = f  # removed when the context goes away
+    return lambda: load(f.name)
+
+
+@benchmark("snapshot.apply_1pct")
+def _(ctx):
+    snap = ctx["snap"]
+    changes = []
+    for i in range(0, len(snap.ward_docs), 100):
+        w = dict(snap.ward_docs[i])
+        w["turnout"] = round(w["turnout"] + 0.1, 1)
+        changes.append((snap.wards[i].municipality, w))
+    return lambda: snap.apply(changes)
+
+
+@benchmark("frames.build")
+def _(ctx):
+    from election.frames import build_candidate_frame, build_ward_frame
+    rows = ctx["snap"].wards
+    return lambda: (build_ward_frame(rows), build_candidate_frame(rows))
+
+
+@benchmark("analytics.aggregate")
+def _(ctx):
+    df = ctx["snap"].frame
+
+    def run():
+        declared = df[df["Status"] == "Declared"]
+        declared.groupby(["Municipality", "Party"], observed=True).size()
+        declared["Gender"].value_counts()
+        declared["Category"].value_counts()
+        df.nlargest(10, "Turnout %")
+    return run
+
+
+@benchmark("analytics.swing")
+def _(ctx):
+    from election.swing import compute
+    snap = ctx["snap"]
+    return lambda: compute(snap)
+
+
+@benchmark("projection.full")
+def _(ctx):
+    from election.projection import Projector
+    snap = ctx["snap"]
+    return lambda: Projector().project(snap)
+
+
+@benchmark("projection.apply_1pct")
+def _(ctx):
+    from election.projection import Projector
+    snap = ctx["snap"]
+    changes = []
+    for i in range(0, len(snap.ward_docs), 100):
+        w = dict(snap.ward_docs[i])
+        w["turnout"] = round(w["turnout"] + 0.1, 1)
+        changes.append((snap.wards[i].municipality, w))
+    versions = [snap.apply(changes), snap]
+    projector = Projector()
+    projector.project(snap)
+
+    def run():
+        # Alternating versions re-simulates just the changed counting wards
+        versions.reverse()
+        projector.project(versions[0])
+    return run
+
+
+@benchmark("export.csv")
+def _(ctx):
+    from election.exports import wards_csv
+    snap = ctx["snap"]
+    return lambda: wards_csv(snap)
+
+
+@benchmark("export.excel")
+def _(ctx):
+    from election.exports import wards_excel
+    snap = ctx["snap"]
+    return lambda: wards_excel(snap)
+
+
+@benchmark("export.parquet")
+def _(ctx):
+    from election.exports import wards_parquet
+    snap = ctx["snap"]
+    return lambda: wards_parquet(snap)
+
+
+@benchmark("export.candidates_csv")
+def _(ctx):
+    from election.exports import candidates_csv
+    snap = ctx["snap"]
+    return lambda: candidates_csv(snap)
+
+
+@benchmark("search.build")
+def _(ctx):
+    from election.search import SearchIndex
+    snap = ctx["snap"]
+    return lambda: SearchIndex(snap)
+
+
+@benchmark("search.query")
+def _(ctx):
+    from election import query
+    snap = ctx["snap"]
+    name = snap.wards[len(snap.wards) // 2].candidates[0].name
+    params = {"q": name.split()[0], "limit": "20"}
+    return lambda: query.search(snap, params)
+
+
+@benchmark("api.render_html")
+def _(ctx):
+    index = ctx["index"]
+    snap = ctx["snap"]
+    return lambda: index.render_html(snap)
+
+
+@benchmark("api.ward_page_cold")
+def _(ctx):
+    from election import render
+    index, snap = ctx["index"], ctx["snap"]
+    slug = ctx["largest_slug"]
+
+    def run():
+        render._cache.clear()
+        index.render_municipality(snap, slug, 1)
+    return run
+
+
+@benchmark("api.query_wards")
+def _(ctx):
+    from election import query
+    snap = ctx["snap"]
+    name = ctx["largest"]
+    params = {"status": "Counting", "fields": "ward_no,winner_party,margin", "limit": "100"}
+    return lambda: json.dumps(query.wards(snap, name, params))
+
+
+@benchmark("api.respond_cold")
+def _(ctx):
+    index, snap = ctx["index"], ctx["snap"]
+    headers = {"Accept-Encoding": "gzip, br"}
+
+    def run():
+        index._responses = (None, 0, {}, {})
+        index.respond(snap, "/", headers)
+    return run
+
+
+@benchmark("api.respond_cached")
+def _(ctx):
+    index, snap = ctx["index"], ctx["snap"]
+    headers = {"Accept-Encoding": "gzip, br"}
+    index.respond(snap, "/api/data", headers)
+    return lambda: index.respond(snap, "/api/data", headers)
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+def build_context(params: dict, seed: int) -> dict:
+    from election.snapshot import Snapshot
+    from election import query
+    import index
+
+    data = generate(seed=seed, **params)
+    raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    snap = Snapshot(data)
+    snap.frame  # built once up front; frames.build measures the cost
+    largest = max(snap.muni_ward_ids, key=lambda n: len(snap.muni_ward_ids[n]))
+    return {
+        "data": data, "raw": raw, "snap": snap, "index": index,
+        "largest": largest, "largest_slug": query.slugify(largest),
+    }
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def measure(fn, min_time: float, min_reps: int, max_reps: int) -> dict:
+    fn()  # warm up
+    gc.collect()
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_reps and (len(times) < min_reps or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter_ns()
+        fn()
+        times.append(time.perf_counter_ns() - t0)
+    total = sum(times) / 1e9
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    ms = [t / 1e6 for t in times]
+    return {
+        "reps": len(ms),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "mean_ms": sum(ms) / len(ms),
+        "ops_per_s": len(ms) / total if total else 0.0,
+        "peak_mb": peak / 1e6,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Return the benchmarks whose median regressed by more than `threshold`."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base and base["p50_ms"] > 0 and r["p50_ms"] > base["p50_ms"] * (1 + threshold):
+            regressions.append((name, base["p50_ms"], r["p50_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the results pipeline.")
+    parser.add_argument("--preset", choices=PRESETS, default="state")
+    parser.add_argument("--ulbs", type=int)
+    parser.add_argument("--wards", type=int, help="mean wards per ULB")
+    parser.add_argument("--candidates", type=int, help="mean candidates per ward")
+    parser.add_argument("--declared", type=float, help="fraction of declared wards")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per benchmark")
+    parser.add_argument("--min-reps", type=int, default=5)
+    parser.add_argument("--max-reps", type=int, default=10000)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed median slowdown vs. baseline (default 0.25)")
+    args = parser.parse_args()
+
+    params = dict(PRESETS[args.preset])
+    for key in ("ulbs", "wards", "candidates", "declared"):
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+
+    ctx = build_context(params, args.seed)
+    snap = ctx["snap"]
+    print(
+        f"dataset: {len(snap.municipalities)} ULBs, {len(snap.wards)} wards, "
+        f"{sum(len(w['candidates']) for w in snap.ward_docs)} candidates, "
+        f"{len(ctx['raw']) / 1e6:.1f} MB JSON"
+    )
+    print(f"{'benchmark':<24}{'reps':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'peak MB':>9}")
+
+    results = {}
+    for name, setup in BENCHMARKS:
+        if args.only and args.only not in name:
+            continue
+        try:
+            r = measure(setup(ctx), args.min_time, args.min_reps, args.max_reps)
+        except ImportError as e:  # optional dependency, e.g. pyarrow
+            print(f"{name:<24}skipped ({e.name or e} not installed)")
+            continue
+        results[name] = r
+        print(
+            f"{name:<24}{r['reps']:>7}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}"
+            f"{r['p99_ms']:>10.3f}{r['ops_per_s']:>10.1f}{r['peak_mb']:>9.1f}"
+        )
+
+    report = {
+        "preset": args.preset,
+        "params": params,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"warning: baseline was recorded with {baseline.get('params')}")
+        missing = [name for name in results if name not in baseline.get("results", {})]
+        if missing:
+            print(f"warning: not in the baseline (re-save it): {', '.join(missing)}")
+        regressions = compare(results, baseline, args.threshold)
+        # Re-measure suspects twice and keep the best median, so one noisy
+        # run on a busy machine does not fail the check
+        setups = dict(BENCHMARKS)
+        for name, _, _ in regressions:
+            for _ in range(2):
+                r = measure(setups[name](ctx), args.min_time, args.min_reps, args.max_reps)
+                if r["p50_ms"] < results[name]["p50_ms"]:
+                    results[name] = r
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%} vs {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Shared results engine for the Streamlit dashboard (app.py) and the
+Vercel API (api/index.py).
+"""
+
+from .records import SchemaError
+from .snapshot import Snapshot, data_version, get_snapshot
+
+__all__ = ["SchemaError", "Snapshot", "data_version", "get_snapshot"]
@@ -0,0 +1,107 @@
+"""
+Delta Ingestion
+===============
+Applies ward-level changes to a Snapshot instead of reloading and
+re-flattening the whole results document.
+
+Changes come from one of two places:
+
+  - A delta feed (ELECTION_DELTA_URL), requested with
+    `?since=<last_updated>` and answering with only the wards that
+    changed since then:
+
+        {
+          "since": "2026-02-27T16:50:00",
+          "last_updated": "2026-02-27T16:55:00",
+          "summary": {...},                     (optional)
+          "wards": [
+            {"municipality": "Ranchi Municipal Corporation",
+             "ward_no": 7, "status": "Declared", ...}
+          ]
+        }
+
+  - A diff between two full documents (`diff_documents`).
+
+Wards are keyed by (municipality, ward_no).
+"""
+
+import json
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from .snapshot import Snapshot, _ward_digests
+
+
+class DeltaMismatch(ValueError):
+    """The delta feed does not continue from the snapshot's version."""
+
+
+def diff_documents(old: dict, new: dict):
+    """
+    Return the (municipality, ward) pairs that differ between two
+    documents, or None if wards were added or removed.
+    """
+    old_digests, new_digests = _ward_digests(old), _ward_digests(new)
+    if old_digests.keys() != new_digests.keys():
+        return None
+    return [
+        (m["name"], w)
+        for m in new.get("municipalities", [])
+        for w in m.get("wards", [])
+        if old_digests[(m["name"], w["ward_no"])] != new_digests[(m["name"], w["ward_no"])]
+    ]
+
+
+def feed_changes(feed: dict):
+    """Split a delta feed's ward entries into (municipality, ward) pairs."""
+    changes = []
+    for entry in feed.get("wards", []):
+        ward = {k: v for k, v in entry.items() if k != "municipality"}
+        changes.append((entry["municipality"], ward))
+    return changes
+
+
+def apply_delta(snap: Snapshot, feed: dict) -> Snapshot:
+    """
+    Apply a delta feed to `snap`, returning the next snapshot (or `snap`
+    itself if the feed carries no changes).
+    Raises DeltaMismatch if the feed was computed against another version
+    or names a municipality the snapshot does not have.
+    """
+    since = feed.get("since")
+    if since is not None and since != snap.last_updated:
+        raise DeltaMismatch(f"delta since {since!r}, snapshot at {snap.last_updated!r}")
+
+    changes = feed_changes(feed)
+    unknown = {name for name, _ in changes if name not in snap.muni_by_name}
+    if unknown:
+        raise DeltaMismatch(f"delta for unknown municipalities: {sorted(unknown)}")
+    last_updated = feed.get("last_updated", snap.last_updated)
+    if not changes and last_updated == snap.last_updated and "summary" not in feed:
+        return snap
+
+    updates = {"last_updated": last_updated}
+    if "summary" in feed:
+        updates["summary"] = feed["summary"]
+    return snap.apply(changes, updates=updates)
+
+
+def delta_request_url(base: str, since: str) -> str:
+    """Append `since=<last_updated>` to the delta feed URL."""
+    parts = urlsplit(base)
+    query = f"{parts.query}&" if parts.query else ""
+    return urlunsplit(parts._replace(query=query + urlencode({"since": since})))
+
+
+def load_feed(body: bytes) -> dict:
+    """Decode a delta feed response body."""
+    feed = json.loads(body.decode("utf-8"))
+    if not isinstance(feed, dict) or not isinstance(feed.get("wards", []), list):
+        raise ValueError("delta feed must be an object with a 'wards' list")
+    for i, entry in enumerate(feed.get("wards", [])):
+        if (
+            not isinstance(entry, dict)
+            or not isinstance(entry.get("municipality"), str)
+            or type(entry.get("ward_no")) is not int
+        ):
+            raise ValueError(f"delta feed wards[{i}]: expected an object with 'municipality' and 'ward_no'")
+    return feed
@@ -0,0 +1,131 @@
+"""
+Ward Change Events
+==================
+Turns successive snapshots into Server-Sent Events for `/api/stream`.
+
+`ward_events(old, new)` diffs two snapshots by their per-ward digests and
+describes each changed ward: a status flip, a new leader, or new counts.
+`EventHub` keeps a short log of encoded events shared by every watcher:
+an update is encoded once, however many clients are connected, and an
+idle watcher is just a thread waiting on a condition until the next
+update or heartbeat. Reconnecting clients resume from `Last-Event-ID`
+while the log still has their position; otherwise they get a `reset`
+event and should refetch.
+"""
+
+import json
+import threading
+from collections import deque
+
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 3000
+LOG_SIZE = 2048
+HEARTBEAT = b": heartbeat\n\n"
+
+
+def format_event(event: str, data, event_id: int = None) -> bytes:
+    """Encode one SSE message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    lines.append(f"data: {payload}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def _ward_payload(row, old=None) -> dict:
+    payload = {
+        "municipality": row.municipality,
+        "ward_no": row.ward_no,
+        "ward_name": row.ward_name,
+        "status": row.status,
+        "leader": row.leader,
+        "party": row.party,
+        "votes": row.votes,
+        "margin": row.margin,
+        "counted_pct": row.counted_pct,
+    }
+    if old is not None:
+        changes = []
+        if old.status != row.status:
+            changes.append("status")
+        if (old.leader, old.party) != (row.leader, row.party):
+            changes.append("leader")
+        if not changes:
+            changes.append("count")
+        payload["changes"] = changes
+        payload["previous"] = {"status": old.status, "leader": old.leader, "party": old.party}
+    return payload
+
+
+def ward_events(old, new):
+    """
+    Return the (event, data) pairs describing the change from snapshot
+    `old` to `new`: one "ward" event per changed ward followed by a
+    "version" event, or a single "reset" event if wards were added or
+    removed.
+    """
+    version = {
+        "version": new.version,
+        "last_updated": new.last_updated,
+        "declared": new.declared_count,
+        "party_seats": new.party_seats,
+    }
+    if old._ward_digests.keys() != new._ward_digests.keys():
+        return [("reset", version)]
+
+    events = []
+    for key, digest in new._ward_digests.items():
+        if old._ward_digests[key] != digest:
+            events.append(("ward", _ward_payload(new.ward_index[key], old.ward_index[key])))
+    events.append(("version", version))
+    return events
+
+
+class EventHub:
+    """A bounded log of encoded events that many watchers wait on."""
+
+    def __init__(self, size: int = LOG_SIZE):
+        self._log = deque(maxlen=size)  # (event id, encoded message)
+        self._next_id = 1
+        self._cond = threading.Condition()
+        self.version = None
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def update(self, old, new):
+        """Publish the events between two snapshots (a DataSource listener)."""
+        if new is None or new is old:
+            return
+        events = ward_events(old, new) if old is not None else []
+        with self._cond:
+            for event, data in events:
+                self._log.append((self._next_id, format_event(event, data, self._next_id)))
+                self._next_id += 1
+            self.version = new.version
+            self._cond.notify_all()
+
+    def since(self, last_id: int):
+        """
+        Return the (event id, message) pairs after `last_id`, or None if the
+        log does not cover that id (too old, or from another process) and
+        the client must resync.
+        """
+        with self._cond:
+            return self._since(last_id)
+
+    def _since(self, last_id: int):
+        if last_id == self.last_id:
+            return []
+        if last_id > self.last_id or not self._log or self._log[0][0] > last_id + 1:
+            return None
+        return [(event_id, msg) for event_id, msg in self._log if event_id > last_id]
+
+    def wait(self, last_id: int, timeout: float = HEARTBEAT_SECONDS):
+        """Like `since()`, but block until there is something or `timeout` passes."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.last_id != last_id, timeout)
+            return self._since(last_id)
@@ -0,0 +1,145 @@
+"""
+Data Exports
+============
+Downloadable files built from a Snapshot, each generated on first
+request and then cached for the rest of that data version:
+
+  - wards.csv        the ward table
+  - wards.xlsx       the ward table, written row by row with openpyxl's
+                     write-only workbook (no per-cell objects kept around)
+  - wards.parquet    the typed ward table (needs pyarrow)
+  - candidates.csv   one row per candidate, with the ward it stood in
+
+Concurrent requests for the same file wait for one build instead of
+each building their own copy.
+"""
+
+import csv
+import io
+import threading
+from collections import OrderedDict
+
+from . import metrics
+from .frames import WARD_COLUMNS
+from .records import COLUMN_ATTRS
+
+# Kept per data version; a new version only needs the files asked for again
+MAX_CACHED_EXPORTS = 8
+
+_cache = OrderedDict()  # (kind, version) -> bytes
+_building = {}          # (kind, version) -> Lock held while building
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Builders
+# ---------------------------------------------------------------------------
+def wards_csv(snap) -> bytes:
+    return snap.frame.to_csv(index=False).encode("utf-8")
+
+
+def wards_excel(snap) -> bytes:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Wards")
+    ws.append(WARD_COLUMNS)
+    attrs = [COLUMN_ATTRS[c] for c in WARD_COLUMNS]
+    for r in snap.wards:
+        ws.append([getattr(r, a) for a in attrs])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def wards_parquet(snap) -> bytes:
+    import pyarrow  # noqa: F401  (fail with ImportError, not pandas' message)
+
+    buf = io.BytesIO()
+    snap.frame.to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+CANDIDATE_EXPORT_COLUMNS = [
+    "Municipality", "Ward No.", "Ward Name", "Status", "Candidate", "Party",
+    "Votes", "Vote %", "Prev Votes", "Leading",
+]
+
+
+def candidates_csv(snap) -> bytes:
+    buf = io.StringIO()
+    out = csv.writer(buf, lineterminator="\n")
+    out.writerow(CANDIDATE_EXPORT_COLUMNS)
+    for r in snap.wards:
+        for c in r.candidates:
+            out.writerow([
+                r.municipality, r.ward_no, r.ward_name, r.status, c.name, c.party,
+                c.votes, c.pct, "" if c.prev_votes is None else c.prev_votes,
+                "Yes" if (c.name, c.party) == (r.leader, r.party) else "",
+            ])
+    return buf.getvalue().encode("utf-8")
+
+
+# kind -> (builder, file name, MIME type, module it needs or None)
+FORMATS = {
+    "csv": (wards_csv, "jharkhand_election_results_2026.csv", "text/csv", None),
+    "excel": (
+        wards_excel, "jharkhand_election_results_2026.xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl",
+    ),
+    "parquet": (
+        wards_parquet, "jharkhand_election_results_2026.parquet",
+        "application/vnd.apache.parquet", "pyarrow",
+    ),
+    "candidates": (candidates_csv, "jharkhand_election_candidates_2026.csv", "text/csv", None),
+}
+
+
+def available(kind: str) -> bool:
+    """True if the optional package `kind` needs is installed."""
+    module = FORMATS[kind][3]
+    if module is None:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+def is_cached(snap, kind: str) -> bool:
+    return (kind, snap.version) in _cache
+
+
+def export(snap, kind: str) -> bytes:
+    """Return the `kind` export of `snap`, building it on first request."""
+    key = (kind, snap.version)
+    with _lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+            metrics.inc("export_cache", result="hit")
+            return body
+        building = _building.setdefault(key, threading.Lock())
+
+    with building:
+        with _lock:
+            body = _cache.get(key)
+        if body is not None:  # built by the request we waited for
+            metrics.inc("export_cache", result="hit")
+            return body
+        metrics.inc("export_cache", result="miss")
+        try:
+            with metrics.timer("export", kind=kind):
+                body = FORMATS[kind][0](snap)
+            with _lock:
+                _cache[key] = body
+                while len(_cache) > MAX_CACHED_EXPORTS:
+                    _cache.popitem(last=False)
+        finally:
+            with _lock:
+                _building.pop(key, None)
+    return body
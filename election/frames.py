@@ -0,0 +1,87 @@
+"""
+Columnar Frames
+===============
+Typed pandas tables for the dashboard, built column by column from a
+Snapshot's WardRecords:
+
+  - wards:       one row per ward, indexed by ward id (its position in
+                 the snapshot), with categoricals for the low-cardinality
+                 text columns.
+  - candidates:  one row per candidate, sorted by ward id, with a
+                 `ward_id` column and an offsets array so a ward's
+                 candidates are a contiguous slice.
+
+Keeping candidates out of the ward table means filters and copies of
+the ward table no longer drag nested lists along.
+"""
+
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+from .records import COLUMN_ATTRS
+
+CATEGORY_COLUMNS = ["Municipality", "Type", "Status", "Party", "Category", "Gender"]
+INT_COLUMNS = ["Ward No.", "Votes", "Margin"]  # whole numbers, see records.WARD_COUNT_FIELDS
+FLOAT_COLUMNS = ["Vote %", "Turnout %", "EVM %", "Counted %"]
+TEXT_COLUMNS = ["Ward Name", "Winner/Leading"]
+
+# Column order of the ward table (matches the historical flatten_wards output)
+WARD_COLUMNS = [
+    "Municipality", "Type", "Ward No.", "Ward Name", "Status", "Winner/Leading",
+    "Party", "Votes", "Vote %", "Margin", "Turnout %", "EVM %", "Counted %",
+    "Category", "Gender",
+]
+CANDIDATE_COLUMNS = ["ward_id", "Name", "Party", "Votes", "Vote %", "Prev Votes"]
+
+
+def _categorical(values) -> pd.Categorical:
+    """Dictionary-encode a list of labels (categories in first-seen order)."""
+    lookup = {}
+    codes = np.array([lookup.setdefault(v, len(lookup)) for v in values], dtype=np.int32)
+    return pd.Categorical.from_codes(codes, categories=list(lookup))
+
+
+def build_ward_frame(rows) -> pd.DataFrame:
+    """Build the typed ward table from snapshot WardRecords."""
+    columns = {}
+    for col in WARD_COLUMNS:
+        values = list(map(attrgetter(COLUMN_ATTRS[col]), rows))
+        if col in CATEGORY_COLUMNS:
+            columns[col] = _categorical(values)
+        elif col in INT_COLUMNS:
+            columns[col] = np.fromiter(values, dtype=np.int64, count=len(values))
+        elif col in FLOAT_COLUMNS:
+            columns[col] = np.fromiter(values, dtype=np.float64, count=len(values))
+        else:
+            columns[col] = values
+    frame = pd.DataFrame(columns, columns=WARD_COLUMNS)
+    frame.index.name = "ward_id"
+    return frame
+
+
+def build_candidate_frame(rows):
+    """
+    Build the candidate table from snapshot WardRecords.
+    Returns (candidates, offsets) where ward i's candidates are rows
+    offsets[i]:offsets[i + 1]. Missing `prev_votes` is NaN.
+    """
+    counts = np.fromiter((len(r.candidates) for r in rows), dtype=np.int64, count=len(rows))
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    total = int(offsets[-1])
+
+    cands = [c for r in rows for c in r.candidates]
+    frame = pd.DataFrame({
+        "ward_id": np.repeat(np.arange(len(rows), dtype=np.int32), counts),
+        "Name": [c.name for c in cands],
+        "Party": _categorical([c.party for c in cands]),
+        "Votes": np.fromiter((c.votes for c in cands), dtype=np.int64, count=total),
+        "Vote %": np.fromiter((c.pct for c in cands), dtype=np.float64, count=total),
+        "Prev Votes": np.fromiter(
+            (np.nan if c.prev_votes is None else c.prev_votes for c in cands),
+            dtype=np.float64, count=total,
+        ),
+    }, columns=CANDIDATE_COLUMNS)
+    return frame, offsets
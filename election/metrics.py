@@ -0,0 +1,213 @@
+"""
+Metrics
+=======
+Process-wide counters and timers for the hot paths, exposed by the API
+at /metrics (Prometheus text format) and by the dashboard's debug panel.
+
+    metrics.inc("response_cache", result="hit")
+    with metrics.timer("parse", source="url"):
+        ...
+
+Hot paths bind a counter once and skip the label handling per call:
+
+    HITS = metrics.counter("response_cache", result="hit")
+    HITS.inc()
+
+Counters are exported as `election_<name>_total`, timers as
+`election_<name>_seconds` summaries (count and sum) plus a
+`..._seconds_max` gauge, and gauges registered with `gauge()` are
+evaluated at scrape time.
+
+Set ELECTION_METRICS=0 to turn collection off; `inc` then returns at
+once and `timer` hands back a shared no-op context manager.
+"""
+
+import os
+import threading
+import time
+
+ENABLED = os.getenv("ELECTION_METRICS", "1") != "0"
+PREFIX = "election_"
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_timers = {}    # (name, labels) -> [count, sum, max]
+_gauges = {}    # name -> (help, callable returning a number or None)
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Add `value` to a counter."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class Counter:
+    """A counter series with its labels resolved up front."""
+
+    __slots__ = ("key", "value", "lock")
+
+    def __init__(self, key):
+        self.key = key
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, value: float = 1):
+        if ENABLED:
+            with self.lock:
+                self.value += value
+
+
+_bound = {}  # key -> Counter
+
+
+def counter(name: str, **labels) -> Counter:
+    key = _key(name, labels)
+    with _lock:
+        bound = _bound.get(key)
+        if bound is None:
+            bound = _bound[key] = Counter(key)
+    return bound
+
+
+def observe(name: str, seconds: float, **labels):
+    """Record one duration for a timer."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        entry = _timers.get(key)
+        if entry is None:
+            _timers[key] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: dict):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str, **labels):
+    """Context manager timing its block into `name`."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def gauge(name: str, fn, help: str = ""):
+    """Register a gauge whose value is `fn()` at scrape time (None to skip)."""
+    _gauges[name] = (help, fn)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        for bound in _bound.values():
+            bound.value = 0
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def collect() -> dict:
+    """A copy of all values: {"counters": {...}, "timers": {...}, "gauges": {...}}."""
+    with _lock:
+        counters = dict(_counters)
+        for key, bound in _bound.items():
+            if bound.value:
+                counters[key] = counters.get(key, 0) + bound.value
+        timers = {k: tuple(v) for k, v in _timers.items()}
+    gauges = {}
+    for name, (_, fn) in list(_gauges.items()):
+        try:
+            value = fn()
+        except Exception:
+            value = None
+        if value is not None:
+            gauges[name] = value
+    return {"counters": counters, "timers": timers, "gauges": gauges}
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    data = collect()
+    lines = []
+
+    by_name = {}
+    for (name, labels), value in sorted(data["counters"].items()):
+        by_name.setdefault(name, []).append((labels, value))
+    for name, series in by_name.items():
+        metric = f"{PREFIX}{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{_labels(labels)} {_number(value)}" for labels, value in series)
+
+    by_name = {}
+    for (name, labels), value in sorted(data["timers"].items()):
+        by_name.setdefault(name, []).append((labels, value))
+    for name, series in by_name.items():
+        metric = f"{PREFIX}{name}_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for labels, (count, total, _) in series:
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {total:.6f}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.extend(f"{metric}_max{_labels(labels)} {peak:.6f}" for labels, (_, _, peak) in series)
+
+    for name, value in sorted(data["gauges"].items()):
+        metric = f"{PREFIX}{name}"
+        help_text = _gauges[name][0]
+        if help_text:
+            lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
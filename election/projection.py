@@ -0,0 +1,356 @@
+"""
+Seat Projection
+===============
+Win probabilities for the wards still counting and the projected final
+seat tally per party, statewide and per ULB, by Monte Carlo simulation
+of the votes left to count.
+
+For a ward with V votes counted at `votes_counted_pct` (or
+`evm_processed` when that is missing), the uncounted votes are
+R = V * (100 - counted) / counted. Each draw splits R between the
+candidates with shares drawn around their current shares (a normal
+approximation of a Dirichlet with CONCENTRATION pseudo-votes, so booths
+still to come can differ from those counted), and the candidate with
+the most final votes wins the draw. Wards with votes but no counted
+percentage are treated as if the whole ward were still to come, split
+around the shares counted so far. Wards with nothing counted yet use
+the previous election's shares, or equal shares, with
+PRIOR_CONCENTRATION instead.
+
+Candidates SAFE_Z standard deviations behind the leader once the
+remaining votes are in are dropped from the race. A ward left with one
+contender is settled; with two, the normal approximation gives the
+leader's chance exactly; the rest are simulated in NumPy batches of
+wards with the same number of contenders (contenders x wards x draws,
+in chunks to bound memory). Results are kept per ward together with
+the ward's content hash, so a new data version only simulates the wards
+whose counts changed; the rest are reused as is.
+
+A party's projected seats are its declared seats plus the sum of its
+win probabilities; the range is a 90% interval around that (normal
+approximation, clipped to what is still possible).
+"""
+
+import math
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+
+DRAWS = 2000                 # simulated outcomes per ward
+CONCENTRATION = 100          # pseudo-votes behind the remaining-vote shares
+PRIOR_CONCENTRATION = 20     # ... when nothing is counted yet
+CHUNK_ELEMENTS = 1 << 18     # contenders x wards x draws simulated per chunk
+SAFE_Z = 6.0                 # candidates this many std devs behind are out
+INTERVAL_Z = 1.645           # 90% interval
+MAX_CACHED_PROJECTIONS = 2
+
+
+class Projection:
+    """
+    `seats`: one row per party (Won, Leading, Projected, Low, High), most
+    projected seats first.
+    `by_muni`: one row per (municipality, party) with Won and Projected.
+    `wards`: one row per counting ward with its favourite and win chance,
+    indexed by ward id, closest races first.
+    """
+
+    def __init__(self, seats: pd.DataFrame, by_muni: pd.DataFrame, wards: pd.DataFrame):
+        self.seats = seats
+        self.by_muni = by_muni
+        self.wards = wards
+
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+def _ward_inputs(rows):
+    """
+    Padded (wards x candidates) arrays for `rows`: counted votes (-inf
+    padding, so it never wins), expected shares, and per ward the
+    remaining votes and the spread scale 1 / sqrt(concentration + 1).
+    """
+    n = len(rows)
+    counts = np.fromiter((len(r.candidates) for r in rows), dtype=np.int64, count=n)
+    width = int(counts.max(initial=0))
+    ward = np.repeat(np.arange(n), counts)
+    col = np.arange(len(ward)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cands = [c for r in rows for c in r.candidates]
+    flat = np.fromiter((c.votes for c in cands), dtype=np.float64, count=len(cands))
+    prev = np.fromiter((c.prev_votes or 0 for c in cands), dtype=np.float64, count=len(cands))
+    pct = np.fromiter((r.counted_pct or r.evm_pct for r in rows), dtype=np.float64, count=n)
+
+    votes = np.full((n, width), -np.inf)
+    votes[ward, col] = flat
+    counted = np.bincount(ward, flat, minlength=n)
+    prev_total = np.bincount(ward, prev, minlength=n)
+    observed = counted > 0
+    known = observed & (pct > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prior = np.where(prev_total[ward] > 0, prev / prev_total[ward], 1 / counts[ward])
+        share = np.where(observed[ward], flat / counted[ward], prior)
+        # Votes counted but no percentage: the whole ward is still to come
+        remaining = np.where(known, counted * np.maximum(100 - pct, 0) / pct, 1.0)
+    votes[~known] = np.where(votes[~known] > -np.inf, 0.0, -np.inf)
+    shares = np.zeros((n, width))
+    shares[ward, col] = share
+    scale = 1 / np.sqrt(np.where(observed, CONCENTRATION, PRIOR_CONCENTRATION) + 1)
+    return votes, shares, remaining, scale
+
+
+def _erfc(x: np.ndarray) -> np.ndarray:
+    """math.erfc over an array (NumPy has no erf)."""
+    return np.array([math.erfc(v) for v in x.tolist()])
+
+
+def simulate(rows, draws: int = DRAWS, rng=None) -> list:
+    """
+    Win probability of each candidate of each WardRecord in `rows`, as a
+    list of arrays parallel to `rows` (candidates in feed order).
+    """
+    rng = rng or np.random.default_rng()
+    votes, shares, remaining, scale = _ward_inputs(rows)
+    n, width = votes.shape
+    wins = np.zeros((n, width))
+    if width:
+        # A candidate is in the race if the leader's final lead over them is
+        # within SAFE_Z deviations (the leader is always in; padding never)
+        expected = votes + remaining[:, None] * shares
+        leader = expected.argmax(axis=1)
+        rows_idx = np.arange(n)
+        p1 = shares[rows_idx, leader][:, None]
+        sd = (remaining * scale)[:, None] * np.sqrt(
+            np.maximum(p1 + shares - (p1 - shares) ** 2, 0))
+        with np.errstate(invalid="ignore"):  # inf - inf for wards without candidates
+            lead = expected[rows_idx, leader][:, None] - expected
+            contender = lead <= SAFE_Z * sd
+        contender[rows_idx, leader] = True
+        k = contender.sum(axis=1)
+        k[votes[:, 0] == -np.inf] = 0
+
+        one = k == 1
+        wins[one, leader[one]] = 1.0
+
+        two = np.flatnonzero(k == 2)
+        if len(two):
+            other = np.where(contender[two] & (np.arange(width) != leader[two, None]))[1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z = lead[two, other] / sd[two, other]
+            p = 0.5 * _erfc(-z / math.sqrt(2))
+            p[np.isnan(p)] = 0.5  # exact tie with nothing left to count
+            wins[two, leader[two]] = p
+            wins[two, other] = 1 - p
+
+        simulated = 0
+        for size in np.unique(k[k > 2]):
+            idx = np.flatnonzero(k == size)
+            cols = np.nonzero(contender[idx])[1].reshape(len(idx), size)
+            _simulate_races(votes, shares, remaining, scale, idx, cols, wins, draws, rng)
+            simulated += len(idx)
+        metrics.inc("projection_draws", simulated * draws)
+
+    return [wins[i, :len(r.candidates)] for i, r in enumerate(rows)]
+
+
+def _simulate_races(votes, shares, remaining, scale, idx, cols, wins, draws, rng):
+    """
+    Simulate the wards `idx`, each raced between the candidates in its
+    row of `cols`, and store their win probabilities in `wins`.
+
+    Final votes = votes + R * p + R * scale * (x - p * (sum(x) + y)) with
+    x ~ N(0, p) per contender and y ~ N(0, 1 - sum(p)) for everyone else:
+    a Dirichlet-like split of the remaining votes with the Dirichlet's
+    covariance. Draws come in antithetic pairs (x and -x), which halves
+    the normals generated, the bulk of the cost, and the noise of the
+    estimate with it. The final votes are worked in place, one contender
+    row (wards x draws) at a time.
+    """
+    size = cols.shape[1]
+    p = shares[idx[:, None], cols].T                                         # contenders x wards
+    spread = remaining[idx] * scale[idx]
+    spread[spread == 0] = 1  # nothing left to count: only exact ties get here
+    # Who wins a draw does not change when every final count is divided by
+    # the ward's spread, which saves a pass over the draws
+    offset = ((votes[idx[:, None], cols] + remaining[idx, None] * shares[idx[:, None], cols]).T
+              / spread).astype(np.float32)
+    rest = np.sqrt(np.maximum(1 - p.sum(axis=0), 0)).astype(np.float32)
+    root = np.sqrt(p).astype(np.float32)
+    p = p.astype(np.float32)
+    half = (draws + 1) // 2
+    step = max(1, CHUNK_ELEMENTS // ((size + 1) * draws))
+    for start in range(0, len(idx), step):
+        sl = slice(start, start + step)
+        m = len(idx[sl])
+        x = np.empty((size + 1, m, draws), dtype=np.float32)
+        x[:, :, :half] = rng.standard_normal((size + 1, m, half), dtype=np.float32)
+        np.negative(x[:, :, :draws - half], out=x[:, :, half:])
+        x[:size] *= root[:, sl, None]
+        x[size] *= rest[sl, None]
+        total = x.sum(axis=0)
+        tmp = np.empty_like(total)
+        top = np.empty(total.shape, dtype=np.bool_)
+        for j in range(size):
+            row = x[j]
+            np.multiply(total, p[j, sl, None], out=tmp)
+            row -= tmp
+            row += offset[j, sl, None]
+        # Count each contender's wins by comparing with the best final count
+        # (cheaper than argmax); a tie credits both, so share by the total
+        best = x[:size].max(axis=0)
+        counts = np.empty((m, size))
+        for j in range(size):
+            np.equal(x[j], best, out=top)
+            counts[:, j] = np.count_nonzero(top, axis=1)
+        wins[idx[sl, None], cols[sl]] = counts / counts.sum(axis=1, keepdims=True)
+
+
+# ---------------------------------------------------------------------------
+# Projector
+# ---------------------------------------------------------------------------
+class Projector:
+    """
+    Projects snapshots, re-simulating only the counting wards whose
+    content changed since the last call.
+    """
+
+    def __init__(self, draws: int = DRAWS):
+        self.draws = draws
+        self._wards = {}  # (municipality, ward no.) -> (content hash, candidate win probabilities)
+        self._lock = threading.Lock()
+
+    def project(self, snap) -> Projection:
+        counting = [i for i, r in enumerate(snap.wards) if r.status != "Declared"]
+        keys = [(snap.wards[i].municipality, snap.wards[i].ward_no) for i in counting]
+        digests = [snap._ward_digests[k] for k in keys]
+        with self._lock:
+            known = dict(self._wards)
+        stale = [j for j, (k, d) in enumerate(zip(keys, digests)) if known.get(k, (None,))[0] != d]
+        metrics.inc("projection_wards", len(stale), result="simulated")
+        metrics.inc("projection_wards", len(counting) - len(stale), result="reused")
+        if stale:
+            rows = [snap.wards[counting[j]] for j in stale]
+            # Seeded by version so a re-run of the same data gives the same numbers
+            rng = np.random.default_rng(int(snap.version.rsplit("-", 1)[-1], 16))
+            with metrics.timer("projection_simulate"):
+                probs = simulate(rows, self.draws, rng)
+            for j, p in zip(stale, probs):
+                known[keys[j]] = (digests[j], p)
+        current = dict(zip(keys, digests))
+        with self._lock:
+            self._wards = {k: v for k, v in known.items() if current.get(k) == v[0]}
+        return _summarize(snap, counting, [known[k][1] for k in keys])
+
+
+def _summarize(snap, counting: list, ward_probs: list) -> Projection:
+    won = {}     # (municipality, party) -> declared seats
+    for r in snap.wards:
+        if r.status == "Declared":
+            won[(r.municipality, r.party)] = won.get((r.municipality, r.party), 0) + 1
+    rows = [snap.wards[i] for i in counting]
+
+    # One row per (counting ward, party): independents share IND
+    sizes = [len(r.candidates) for r in rows]
+    cands = pd.DataFrame({
+        "ward": np.repeat(np.arange(len(rows)), sizes),
+        "Party": pd.array([c.party for r in rows for c in r.candidates], dtype=object),
+        "p": np.concatenate(ward_probs) if rows else np.zeros(0),
+    })
+    party_probs = cands.groupby(["ward", "Party"], sort=False)["p"].sum().reset_index()
+    ward = party_probs["ward"].to_numpy()
+    party = party_probs["Party"].to_numpy(dtype=object)
+    prob = party_probs["p"].to_numpy()
+    munis = np.array([r.municipality for r in rows], dtype=object)
+    leaders = np.array([r.party for r in rows], dtype=object)
+
+    per_muni = party_probs.groupby([munis[ward], party], sort=False)["p"].sum()
+    expected = dict(zip(per_muni.index, per_muni.to_numpy()))
+    per_party = pd.Series(prob * (1 - prob)).groupby(party, sort=False).sum()
+    variance = dict(zip(per_party.index, per_party.to_numpy()))
+    leading = Counter(leaders.tolist())
+
+    fav_party = leaders.copy()  # wards without candidates keep their leader
+    fav_p = np.zeros(len(rows))
+    top = party_probs.groupby("ward", sort=False)["p"].idxmax().to_numpy()
+    fav_party[ward[top]] = party[top]
+    fav_p[ward[top]] = prob[top]
+    leader_win = np.zeros(len(rows))
+    is_leader = party == leaders[ward]
+    leader_win[ward[is_leader]] = prob[is_leader]
+
+    order = {m: i for i, m in enumerate(snap.muni_by_name)}
+    keys = sorted({**dict.fromkeys(won), **dict.fromkeys(expected)}, key=lambda k: order[k[0]])
+    by_muni = pd.DataFrame(
+        [(m, party, won.get((m, party), 0), won.get((m, party), 0) + expected.get((m, party), 0.0))
+         for m, party in keys],
+        columns=["Municipality", "Party", "Won", "Projected"],
+    )
+    seats = by_muni.groupby("Party", sort=False)[["Won", "Projected"]].sum()
+    seats["Leading"] = [leading[party] for party in seats.index]
+    spread = INTERVAL_Z * np.sqrt([variance.get(party, 0.0) for party in seats.index])
+    seats["Low"] = np.maximum(np.floor(seats["Projected"] - spread), seats["Won"]).astype("int64")
+    seats["High"] = np.minimum(np.ceil(seats["Projected"] + spread), seats["Won"] + len(counting)).astype("int64")
+    seats["Projected"] = seats["Projected"].round(1)
+    seats = seats.reset_index().sort_values("Projected", ascending=False, kind="stable")
+
+    by_muni["Projected"] = by_muni["Projected"].round(1)
+    by_muni["_order"] = by_muni["Municipality"].map(order)
+    by_muni = by_muni.sort_values(["_order", "Projected"], ascending=[True, False], kind="stable")
+
+    wards = pd.DataFrame({
+        "ward_id": counting,
+        "Municipality": [r.municipality for r in rows],
+        "Ward No.": [r.ward_no for r in rows],
+        "Ward Name": [r.ward_name for r in rows],
+        "Winner/Leading": [r.leader for r in rows],
+        "Party": [r.party for r in rows],
+        "Counted %": [r.counted_pct for r in rows],
+        "Leader Win %": np.round(100 * leader_win, 1),
+        "Favourite": fav_party,
+        "Favourite Win %": np.round(100 * fav_p, 1),
+    }).set_index("ward_id").sort_values("Favourite Win %", kind="stable")
+
+    return Projection(
+        seats=seats[["Party", "Won", "Leading", "Projected", "Low", "High"]].reset_index(drop=True),
+        by_muni=by_muni.drop(columns="_order").reset_index(drop=True),
+        wards=wards,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+_projector = Projector()
+_projections = OrderedDict()  # version -> Projection
+_projections_lock = threading.Lock()  # guards _projections only
+_compute_lock = threading.Lock()      # one projection is computed at a time
+
+
+def _cached(snap):
+    """The projection for a snapshot's version if it is already computed, else None."""
+    with _projections_lock:
+        return _projections.get(snap.version)
+
+
+def project(snap) -> Projection:
+    """
+    The projection for a snapshot's version, computed on first use. The
+    app subscribes this to its results source, so each version is
+    projected on the fetcher thread and pages normally only read the cache;
+    computing never blocks readers of versions already cached.
+    """
+    result = _cached(snap)
+    if result is not None:
+        return result
+    with _compute_lock:
+        result = _cached(snap)  # computed while we waited
+        if result is None:
+            with metrics.timer("projection"):
+                result = _projector.project(snap)
+            with _projections_lock:
+                _projections[snap.version] = result
+                while len(_projections) > MAX_CACHED_PROJECTIONS:
+                    _projections.popitem(last=False)
+        return result
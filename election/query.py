@@ -0,0 +1,190 @@
+"""
+Results Queries
+===============
+Slices of a Snapshot for the JSON API, answered from the snapshot's
+indexes instead of the whole document:
+
+  - summary()          state totals and party seats
+  - municipalities()   one progress row per ULB
+  - wards()            one municipality's wards, filtered by status,
+                       projected to the requested fields and paginated
+  - search()           statewide ward / candidate name search
+
+Query errors raise NotFound (unknown municipality) or BadRequest (bad
+parameter); the API maps them, and only them, to 404 and 400.
+"""
+
+import unicodedata
+
+from . import search as name_search
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+# Ward fields a client may ask for with ?fields=
+WARD_FIELDS = (
+    "ward_no", "ward_name", "status", "winner", "winner_party", "winner_votes",
+    "vote_pct", "margin", "turnout", "evm_processed", "votes_counted_pct",
+    "category", "gender", "candidates",
+)
+
+# Races reported per ULB, depending on its type
+RACE_FIELDS = ("mayor_race", "chairman_race", "president_race")
+
+
+class NotFound(LookupError):
+    """The requested municipality or page does not exist (HTTP 404)."""
+
+
+class BadRequest(ValueError):
+    """A query parameter is missing or invalid (HTTP 400)."""
+
+
+def slugify(name: str) -> str:
+    """URL slug for a municipality name ("Ranchi Municipal Corporation" -> "ranchi-municipal-corporation")."""
+    # Combining marks (Devanagari vowel signs) stay with their letters
+    return "-".join("".join(
+        c if c.isalnum() or unicodedata.category(c).startswith("M") else " " for c in name.lower()
+    ).split())
+
+
+def find_municipality(snap, key: str) -> str:
+    """Resolve a municipality name or slug to its name."""
+    if key in snap.muni_by_name:
+        return key
+    slug = slugify(key)
+    for m in snap.municipalities:
+        if slugify(m["name"]) == slug:
+            return m["name"]
+    raise NotFound(f"unknown municipality: {key}")
+
+
+def _int_param(params: dict, name: str, default: int, low: int, high: int = None) -> int:
+    raw = params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+    if value < low or (high is not None and value > high):
+        bound = f"between {low} and {high}" if high is not None else f">= {low}"
+        raise BadRequest(f"{name} must be {bound}")
+    return value
+
+
+def summary(snap) -> dict:
+    return {
+        "last_updated": snap.last_updated,
+        "version": snap.version,
+        "total_ulbs": len(snap.municipalities),
+        "total_wards": snap.total_wards,
+        "declared": snap.declared_count,
+        "avg_turnout": round(snap.avg_turnout, 2),
+        "party_seats": snap.party_seats,
+        "summary": snap.summary,
+    }
+
+
+def municipalities(snap) -> dict:
+    rows = []
+    for p in snap.muni_progress:
+        m = snap.muni_by_name[p["name"]]
+        row = {
+            "name": p["name"],
+            "slug": slugify(p["name"]),
+            "type": p["type"],
+            "total_wards": p["total_wards"],
+            "declared": p["declared"],
+            "pct_complete": p["pct_complete"],
+        }
+        for race in RACE_FIELDS:
+            if m.get(race):
+                row[race] = m[race]
+        rows.append(row)
+    return {"last_updated": snap.last_updated, "municipalities": rows}
+
+
+def wards(snap, municipality: str, params: dict) -> dict:
+    """
+    Wards of one municipality in ward order. `params` (single values):
+      status   only wards with this status (e.g. Declared, Counting)
+      fields   comma-separated subset of WARD_FIELDS (default: all)
+      limit    page size, 1..MAX_LIMIT (default DEFAULT_LIMIT)
+      offset   number of matching wards to skip
+    """
+    name = find_municipality(snap, municipality)
+    limit = _int_param(params, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+    offset = _int_param(params, "offset", 0, 0)
+
+    fields = None
+    if params.get("fields"):
+        fields = [f.strip() for f in params["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in WARD_FIELDS]
+        if unknown:
+            raise BadRequest(f"unknown fields: {', '.join(unknown)}")
+
+    ward_ids = snap.muni_ward_ids[name]
+    status = params.get("status")
+    if status:
+        status = status.lower()
+        ward_ids = [i for i in ward_ids if snap.wards[i].status.lower() == status]
+
+    docs = [snap.ward_docs[i] for i in ward_ids[offset:offset + limit]]
+    if fields is not None:
+        docs = [{f: w.get(f) for f in fields} for w in docs]
+    return {
+        "municipality": name,
+        "last_updated": snap.last_updated,
+        "total": len(ward_ids),
+        "offset": offset,
+        "limit": limit,
+        "wards": docs,
+    }
+
+
+def search(snap, params: dict) -> dict:
+    """
+    Wards and candidates whose names match `q`, statewide or in one
+    municipality, in ward order. `params` (single values):
+      q             the name to look for (Hindi or Latin spelling)
+      municipality  limit the search to one municipality (name or slug)
+      limit         page size, 1..MAX_LIMIT (default DEFAULT_LIMIT)
+      offset        number of matches to skip
+    Each match is a ward name (candidate None) or a candidate in a ward.
+    """
+    q = (params.get("q") or "").strip()
+    if not q:
+        raise BadRequest("q is required")
+    limit = _int_param(params, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+    offset = _int_param(params, "offset", 0, 0)
+
+    lo, hi = 0, None
+    if params.get("municipality"):
+        ward_ids = snap.muni_ward_ids[find_municipality(snap, params["municipality"])]
+        lo, hi = (min(ward_ids), max(ward_ids) + 1) if ward_ids else (0, 0)
+
+    index = name_search.get_index(snap)
+    matches = []
+    for ward_id, pos in index.matches(q, lo, hi, offset, limit):
+        r = snap.wards[ward_id]
+        c = r.candidates[pos] if pos >= 0 else None
+        matches.append({
+            "municipality": r.municipality,
+            "slug": slugify(r.municipality),
+            "ward_no": r.ward_no,
+            "ward_name": r.ward_name,
+            "status": r.status,
+            "candidate": None if c is None else {
+                "name": c.name, "party": c.party, "votes": c.votes, "pct": c.pct,
+                "leading": (c.name, c.party) == (r.leader, r.party),
+            },
+        })
+    return {
+        "q": q,
+        "last_updated": snap.last_updated,
+        "total": index.count(q, lo, hi),
+        "offset": offset,
+        "limit": limit,
+        "matches": matches,
+    }
@@ -0,0 +1,302 @@
+"""
+Ward Records
+============
+Validation and normalization of the results document, done once per
+data version when a Snapshot is built (and only for the changed wards
+when one is updated incrementally).
+
+`check_document(data)` checks the document's shape: the municipality
+list, names, ward lists and unique (municipality, ward_no) keys.
+`ward_record(muni, w)` checks one ward's fields and turns it into a
+compact `WardRecord` with the leader fallbacks already resolved, so the
+dashboard, the API and the frames read plain attributes instead of
+re-deriving `w.get(...) or candidates[0][...]` everywhere.
+
+A malformed document raises SchemaError (a ValueError) naming the
+offending municipality, ward and field; the data source keeps serving
+the previous snapshot and reports the error.
+"""
+
+from typing import NamedTuple
+
+MAX_REPORTED = 5
+
+WARD_NUMBER_FIELDS = (
+    "winner_votes", "vote_pct", "margin", "turnout", "evm_processed", "votes_counted_pct",
+)
+WARD_TEXT_FIELDS = ("ward_name", "winner", "winner_party", "category", "gender")
+# Number fields that count votes, so must be whole (integer frame columns)
+WARD_COUNT_FIELDS = ("winner_votes", "margin")
+
+
+class SchemaError(ValueError):
+    """The results document does not match the expected schema."""
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        message = "; ".join(self.problems[:MAX_REPORTED])
+        if len(self.problems) > MAX_REPORTED:
+            message += f" (+{len(self.problems) - MAX_REPORTED} more)"
+        super().__init__(f"invalid results document: {message}")
+
+
+def _is_int(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _is_count(v) -> bool:
+    """None, an int, or a float without a fraction (12.0 but not 12.5)."""
+    t = type(v)
+    return t is int or v is None or (t is float and v.is_integer())
+
+
+# ---------------------------------------------------------------------------
+# Records
+# ---------------------------------------------------------------------------
+class Candidate(NamedTuple):
+    """One candidate of a ward, with defaults filled in (a plain tuple)."""
+
+    name: str
+    party: str
+    votes: int
+    pct: float
+    prev_votes: float = None  # None for first-time wards
+
+
+class WardRecord:
+    """One ward, flattened: municipality fields, resolved leader, counts."""
+
+    __slots__ = (
+        "municipality", "type", "ward_no", "ward_name", "status", "leader", "party",
+        "votes", "vote_pct", "margin", "turnout", "evm_pct", "counted_pct",
+        "category", "gender", "candidates",
+    )
+
+    def __init__(self, municipality, type, ward_no, ward_name, status, leader, party,
+                 votes, vote_pct, margin, turnout, evm_pct, counted_pct,
+                 category, gender, candidates):
+        self.municipality = municipality
+        self.type = type
+        self.ward_no = ward_no
+        self.ward_name = ward_name
+        self.status = status
+        self.leader = leader
+        self.party = party
+        self.votes = votes
+        self.vote_pct = vote_pct
+        self.margin = margin
+        self.turnout = turnout
+        self.evm_pct = evm_pct
+        self.counted_pct = counted_pct
+        self.category = category
+        self.gender = gender
+        self.candidates = candidates  # tuple of Candidate, in feed order
+
+    def __eq__(self, other):
+        if not isinstance(other, WardRecord):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"WardRecord({self.municipality!r}, {self.ward_no}, {self.status!r})"
+
+
+# Ward table column -> WardRecord attribute (see frames.WARD_COLUMNS)
+COLUMN_ATTRS = {
+    "Municipality": "municipality",
+    "Type": "type",
+    "Ward No.": "ward_no",
+    "Ward Name": "ward_name",
+    "Status": "status",
+    "Winner/Leading": "leader",
+    "Party": "party",
+    "Votes": "votes",
+    "Vote %": "vote_pct",
+    "Margin": "margin",
+    "Turnout %": "turnout",
+    "EVM %": "evm_pct",
+    "Counted %": "counted_pct",
+    "Category": "category",
+    "Gender": "gender",
+}
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+def check_document(data) -> None:
+    """
+    Check the document's structure (not the ward fields, see ward_record).
+    Raises SchemaError listing what is wrong.
+    """
+    if not isinstance(data, dict):
+        raise SchemaError(["document: expected an object"])
+    problems = []
+    if not isinstance(data.get("last_updated", ""), str):
+        problems.append("last_updated: expected a string")
+    if not isinstance(data.get("summary", {}), dict):
+        problems.append("summary: expected an object")
+    munis = data.get("municipalities")
+    if not isinstance(munis, list):
+        raise SchemaError(problems + ["municipalities: expected a list"])
+
+    names = set()
+    for i, m in enumerate(munis):
+        if not isinstance(m, dict):
+            problems.append(f"municipalities[{i}]: expected an object")
+            continue
+        name = m.get("name")
+        if not isinstance(name, str) or not name:
+            problems.append(f"municipalities[{i}].name: expected a non-empty string")
+            continue
+        if name in names:
+            problems.append(f"{name!r}: duplicate municipality")
+        names.add(name)
+        if not isinstance(m.get("type", ""), str):
+            problems.append(f"{name!r}.type: expected a string")
+        if not _is_int(m.get("total_wards")) or m["total_wards"] < 0:
+            problems.append(f"{name!r}.total_wards: expected a non-negative integer")
+        wards = m.get("wards", [])
+        if not isinstance(wards, list):
+            problems.append(f"{name!r}.wards: expected a list")
+            continue
+        seen = set()
+        for j, w in enumerate(wards):
+            ward_no = w.get("ward_no") if isinstance(w, dict) else None
+            if not _is_int(ward_no):
+                problems.append(f"{name!r}.wards[{j}].ward_no: expected an integer")
+            elif ward_no in seen:
+                problems.append(f"{name!r} ward {ward_no}: duplicate ward")
+            else:
+                seen.add(ward_no)
+        if len(problems) > MAX_REPORTED:
+            break
+    if problems:
+        raise SchemaError(problems)
+
+
+_make_candidate = Candidate._make
+# Exact types, so that bool is not accepted as a number
+_OPT_NUMBER = (int, float, type(None))
+_OPT_TEXT = (str, type(None))
+
+
+def _ward_problems(w: dict) -> list:
+    """
+    Describe what is wrong with a ward that failed the fast check, using
+    the same exact-type tests as ward_record() (a str or dict subclass is
+    rejected there, so it is reported here).
+    """
+    problems = []
+    status = w.get("status")
+    if type(status) is not str or not status:
+        problems.append("status: expected a non-empty string")
+    for f in WARD_NUMBER_FIELDS:
+        if type(w.get(f)) not in _OPT_NUMBER:
+            problems.append(f"{f}: expected a number")
+        elif f in WARD_COUNT_FIELDS and not _is_count(w.get(f)):
+            problems.append(f"{f}: expected a whole number")
+    for f in WARD_TEXT_FIELDS:
+        if type(w.get(f)) not in _OPT_TEXT:
+            problems.append(f"{f}: expected a string")
+    candidates = w.get("candidates", [])
+    if type(candidates) is not list:
+        return problems + ["candidates: expected a list"]
+    for k, c in enumerate(candidates):
+        if type(c) is not dict:
+            problems.append(f"candidates[{k}]: expected an object")
+            continue
+        for f in ("name", "party"):
+            if type(c.get(f)) not in _OPT_TEXT:
+                problems.append(f"candidates[{k}].{f}: expected a string")
+        votes = c.get("votes")
+        if not _is_count(votes) or (votes is not None and votes < 0):
+            problems.append(f"candidates[{k}].votes: expected a non-negative whole number")
+        for f in ("pct", "prev_votes"):
+            if type(c.get(f)) not in _OPT_NUMBER:
+                problems.append(f"candidates[{k}].{f}: expected a number")
+    return problems
+
+
+def build_candidates(names, parties, votes, pcts, prev_votes) -> list:
+    """Candidates from already validated columns of raw values, defaults filled in."""
+    return list(map(_make_candidate, zip(
+        [n or "—" for n in names], [p or "—" for p in parties],
+        [v or 0 for v in votes], [p or 0 for p in pcts], prev_votes,
+    )))
+
+
+def _candidate(c) -> Candidate:
+    """Build a candidate, or return None if any field has the wrong type."""
+    if type(c) is not dict:
+        return None
+    name, party, votes = c.get("name"), c.get("party"), c.get("votes")
+    pct, prev = c.get("pct"), c.get("prev_votes")
+    if (
+        type(name) in _OPT_TEXT and type(party) in _OPT_TEXT
+        and _is_count(votes) and (votes is None or votes >= 0)
+        and type(pct) in _OPT_NUMBER and type(prev) in _OPT_NUMBER
+    ):
+        return _make_candidate((name or "—", party or "—", votes or 0, pct or 0, prev))
+    return None
+
+
+def ward_record(muni: dict, w: dict) -> WardRecord:
+    """
+    Validate one ward of `muni` and build its record (see build_record).
+    Raises SchemaError if a field has the wrong type.
+    """
+    if type(w) is not dict or type(w.get("ward_no")) is not int:
+        raise SchemaError([f"{muni['name']!r}: ward without an integer ward_no"])
+
+    # Fast path: check while building; describe the problems only on failure
+    status = w.get("status")
+    raw = w.get("candidates", [])
+    ok = type(status) is str and status and type(raw) is list
+    if ok:
+        candidates = tuple(map(_candidate, raw))
+        ok = None not in candidates
+    if ok:
+        for f in WARD_NUMBER_FIELDS:
+            if type(w.get(f)) not in _OPT_NUMBER:
+                ok = False
+        for f in WARD_COUNT_FIELDS:
+            if not _is_count(w.get(f)):
+                ok = False
+        for f in WARD_TEXT_FIELDS:
+            if type(w.get(f)) not in _OPT_TEXT:
+                ok = False
+    if not ok:
+        where = f"{muni['name']!r} ward {w['ward_no']}"
+        raise SchemaError([f"{where}: {p}" for p in _ward_problems(w)])
+
+    return build_record(muni, w, candidates)
+
+
+def build_record(muni: dict, w: dict, candidates: tuple) -> WardRecord:
+    """
+    Build the record of an already validated ward (see ward_record), with
+    the leader fields resolved from the top candidate when the ward has no
+    winner yet. `w` only needs the scalar fields.
+    """
+    top = candidates[0] if candidates else None
+    return WardRecord(
+        municipality=muni["name"],
+        type=muni.get("type", ""),
+        ward_no=w["ward_no"],
+        ward_name=w.get("ward_name") or f"Ward {w['ward_no']}",
+        status=w["status"],
+        leader=w.get("winner") or (top.name if top else "—"),
+        party=w.get("winner_party") or (top.party if top else "—"),
+        votes=w.get("winner_votes") or (top.votes if top else 0),
+        vote_pct=w.get("vote_pct") or 0,
+        margin=w.get("margin") or 0,
+        turnout=w.get("turnout") or 0,
+        evm_pct=w.get("evm_processed") or 0,
+        counted_pct=w.get("votes_counted_pct") or 0,
+        category=w.get("category") or "—",
+        gender=w.get("gender") or "—",
+        candidates=candidates,
+    )
@@ -0,0 +1,139 @@
+"""
+Ward Table Renderer
+===================
+Renders a municipality's wards as an HTML table, shared by the Streamlit
+municipality page and the API dashboard.
+
+A table is described by a TableSpec: a list of (header, row key, column
+formatter). Each formatter turns a whole column into <td> cells in one
+pass; the columns are zipped into rows and the table is joined once.
+Text is HTML escaped.
+
+Rendered rows are cached per (table, municipality, data version), so a
+warm full table is a lookup plus one join, and a filtered table joins a
+subset of the cached rows.
+"""
+
+import threading
+from collections import OrderedDict
+from html import escape
+from operator import attrgetter
+
+from . import metrics
+from .records import COLUMN_ATTRS
+
+MAX_CACHED_TABLES = 256
+
+
+# ---------------------------------------------------------------------------
+# Column formatters: list of values -> list of <td> cells
+# ---------------------------------------------------------------------------
+def text(values):
+    return [f"<td>{escape(str(v))}</td>" for v in values]
+
+
+def strong(values):
+    return [f"<td><strong>{escape(str(v))}</strong></td>" for v in values]
+
+
+def thousands(values):
+    return [f"<td>{v:,}</td>" for v in values]
+
+
+def percent(values):
+    return [f"<td>{v:.1f}%</td>" for v in values]
+
+
+def ward_label(values):
+    return [f"<td>Ward {escape(str(v))}</td>" for v in values]
+
+
+def status_badge(badge_class: str = ""):
+    """Status as a badge span; `badge_class` is added to the badge-* class."""
+    prefix = f"{badge_class} " if badge_class else ""
+
+    def fmt(values):
+        return [
+            f'<td><span class="{prefix}{"badge-declared" if v == "Declared" else "badge-counting"}">'
+            f"{escape(str(v))}</span></td>"
+            for v in values
+        ]
+    return fmt
+
+
+def party(colors: dict, inline: bool = True):
+    """Party name in its color, on an inner span or (inline=False) on the cell."""
+    def fmt(values):
+        if inline:
+            return [
+                f'<td><span style="color:{colors.get(v, "#999")};font-weight:700">{escape(str(v))}</span></td>'
+                for v in values
+            ]
+        return [
+            f'<td style="color:{colors.get(v, "#999")};font-weight:700">{escape(str(v))}</td>'
+            for v in values
+        ]
+    return fmt
+
+
+# ---------------------------------------------------------------------------
+# Tables
+# ---------------------------------------------------------------------------
+class TableSpec:
+    """
+    A named table layout; `columns` is a list of (header, ward table
+    column, formatter), e.g. ("Votes", "Votes", thousands).
+    """
+
+    def __init__(self, name: str, columns, open_tag: str = "<table>"):
+        self.name = name
+        self.columns = columns
+        self._getters = [attrgetter(COLUMN_ATTRS[key]) for _, key, _ in columns]
+        self.head = (
+            open_tag + "<thead><tr>"
+            + "".join(f"<th>{escape(h)}</th>" for h, _, _ in columns)
+            + "</tr></thead><tbody>"
+        )
+        self.tail = "</tbody></table>"
+
+    def render_rows(self, rows) -> list:
+        """Return one "<tr>...</tr>" string per WardRecord."""
+        cells = [
+            fmt(list(map(get, rows)))
+            for get, (_, _, fmt) in zip(self._getters, self.columns)
+        ]
+        return ["<tr>" + "".join(tds) + "</tr>" for tds in zip(*cells)]
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached_rows(spec: TableSpec, snap, municipality: str) -> list:
+    key = (spec.name, municipality, snap.version)
+    with _cache_lock:
+        rows = _cache.get(key)
+        if rows is not None:
+            _cache.move_to_end(key)
+            metrics.inc("table_cache", result="hit")
+            return rows
+    metrics.inc("table_cache", result="miss")
+    with metrics.timer("table_render", table=spec.name):
+        rows = spec.render_rows(snap.wards_by_muni[municipality])
+    with _cache_lock:
+        _cache[key] = rows
+        while len(_cache) > MAX_CACHED_TABLES:
+            _cache.popitem(last=False)
+    return rows
+
+
+def ward_table(spec: TableSpec, snap, municipality: str, ward_ids=None) -> str:
+    """
+    Render a municipality's ward table. With `ward_ids` (a subset of the
+    municipality's ward ids, in ward order) only those wards are included.
+    """
+    rows = _cached_rows(spec, snap, municipality)
+    if ward_ids is not None:
+        position = {wid: i for i, wid in enumerate(snap.muni_ward_ids[municipality])}
+        rows = [rows[position[wid]] for wid in ward_ids]
+    return spec.head + "".join(rows) + spec.tail
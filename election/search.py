@@ -0,0 +1,237 @@
+"""
+Name Search
+===========
+A trigram index over every ward name and every candidate name in a
+Snapshot, built once per data version, for the dashboard's ward search
+and the statewide /api/search endpoint.
+
+Names are folded before indexing and before matching, so spelling and
+script differences do not matter: Devanagari is transliterated to Latin,
+and both are reduced to a consonant skeleton (vowels, aspirate "h",
+word-final "y" and doubled letters dropped, w/v, z/j, ph/f and q/k
+merged, final "ंव" read as "n" as in गांव/gaon). Vowels go everywhere,
+word-initial ones included, so a query folds the same way whether it
+starts a name or the middle of one. "Savita Kachchhap", "savita
+kachhap" and "सविता कच्छप" all fold to "svt kcp"; "Tirkey" and "तिर्की"
+to "trk"; "Oraon" and "उरांव" to "rn".
+
+A query matches a name when its folded form is a substring of the
+name's folded form. Names are deduplicated before indexing, the
+trigram posting sets narrow a query down to a few distinct names, and
+only those are checked, so a lookup does not scan the whole state.
+Queries shorter than one trigram fall back to scanning the distinct
+names. Results come out in ward order and can be limited to one
+municipality's wards or paged without materializing every match.
+"""
+
+import heapq
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import islice
+
+MAX_CACHED_INDEXES = 2
+
+# ---------------------------------------------------------------------------
+# Folding
+# ---------------------------------------------------------------------------
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ii", "उ": "u", "ऊ": "uu", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऍ": "e", "ऑ": "o",
+}
+_MATRAS = {
+    "ा": "aa", "ि": "i", "ी": "ii", "ु": "u", "ू": "uu", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॅ": "e", "ॉ": "o",
+}
+_SIGNS = {"ं": "n", "ँ": "n", "ः": "h"}
+_VIRAMA = "्"
+_NUKTA = "़"
+_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+_LATIN_RULES = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"(?<=[bcdfghjklmnpqrstvxz])h"), ""),  # aspirates: kh -> k, chh -> c
+    (re.compile(r"(?<=[a-z])y\b"), ""),                # Tirkey/तिर्की, Roy/राय
+    (re.compile(r"[aeiou]"), ""),                       # all vowels, word-initial too
+    (re.compile(r"nv\b"), "n"),                         # उरांव/Oraon, गांव/gaon
+    (re.compile(r"([a-z])\1+"), r"\1"),                # doubled letters
+    (re.compile(r" +"), " "),                           # words that were only vowels
+]
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _transliterate(text: str) -> str:
+    """Devanagari to a plain Latin spelling; other characters pass through."""
+    out = []
+    pending = False  # a consonant whose inherent "a" is not yet written
+    for ch in unicodedata.normalize("NFD", text):
+        if ch == _NUKTA:
+            continue
+        if ch in _CONSONANTS:
+            if pending:
+                out.append("a")
+            out.append(_CONSONANTS[ch])
+            pending = True
+            continue
+        if ch in _MATRAS:
+            out.append(_MATRAS[ch])
+        elif ch == _VIRAMA:
+            pass
+        else:
+            if pending and not ch.isspace():
+                out.append("a")
+            out.append(_VOWELS.get(ch) or _SIGNS.get(ch) or _DIGITS.get(ch) or ch)
+        pending = False
+    return "".join(out)  # a word-final inherent "a" is never written
+
+
+def fold(text: str) -> str:
+    """Reduce a name to the form used for indexing and matching."""
+    text = _transliterate(text)
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    text = _NON_WORD.sub(" ", text.lower()).strip()
+    for pattern, repl in _LATIN_RULES:
+        text = pattern.sub(repl, text)
+    return text.strip()
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class SearchIndex:
+    """
+    Folded names -> where they occur. Occurrences of a name are kept as
+    parallel arrays of ward ids (ascending) and candidate positions, with
+    position -1 for the ward's own name. A municipality's wards have
+    consecutive ids, so a search limited to one is a bisect per name.
+    """
+
+    def __init__(self, snap):
+        self.names = []         # distinct folded names
+        self.ward_ids = []      # per name: array of ward ids, ascending
+        self.positions = []     # per name: array of candidate positions (-1: ward name)
+        self._postings = {}     # trigram -> set of name ids
+        ids = {}                # folded name -> name id
+        folded = {}             # raw name -> folded name (names repeat a lot)
+        for ward_id, r in enumerate(snap.wards):
+            names = [(r.ward_name, -1)] + [(c.name, pos) for pos, c in enumerate(r.candidates)]
+            for raw, pos in names:
+                key = folded.get(raw)
+                if key is None:
+                    key = folded[raw] = fold(raw)
+                name_id = ids.get(key)
+                if name_id is None:
+                    name_id = ids[key] = self._add_name(key)
+                self.ward_ids[name_id].append(ward_id)
+                self.positions[name_id].append(pos)
+
+    def _add_name(self, folded: str) -> int:
+        name_id = len(self.names)
+        self.names.append(folded)
+        self.ward_ids.append(array("i"))
+        self.positions.append(array("i"))
+        for gram in _trigrams(folded):
+            self._postings.setdefault(gram, set()).add(name_id)
+        return name_id
+
+    def _matching_names(self, folded: str):
+        grams = _trigrams(folded)
+        if not grams:
+            return [i for i, name in enumerate(self.names) if folded in name]
+        sets = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                return []
+            sets.append(posting)
+        sets.sort(key=len)
+        found = set.intersection(*sets) if len(sets) > 1 else sets[0]
+        return [i for i in found if folded in self.names[i]]
+
+    def _ranges(self, query: str, lo: int, hi: int):
+        """(name id, start, stop) slices of the occurrences within [lo, hi)."""
+        folded = fold(query)
+        if not folded:
+            return []
+        ranges = []
+        for name_id in self._matching_names(folded):
+            wards = self.ward_ids[name_id]
+            start = bisect_left(wards, lo) if lo else 0
+            stop = bisect_left(wards, hi) if hi is not None else len(wards)
+            if start < stop:
+                ranges.append((name_id, start, stop))
+        return ranges
+
+    def _merged(self, ranges):
+        return heapq.merge(*(
+            zip(self.ward_ids[i][start:stop], self.positions[i][start:stop])
+            for i, start, stop in ranges
+        ))
+
+    def count(self, query: str, lo: int = 0, hi: int = None) -> int:
+        """Number of matching names (ward names and candidates) in wards [lo, hi)."""
+        return sum(stop - start for _, start, stop in self._ranges(query, lo, hi))
+
+    def matches(self, query: str, lo: int = 0, hi: int = None, offset: int = 0, limit: int = None):
+        """
+        (ward id, candidate position) pairs matching `query` in wards
+        [lo, hi), in ward id order, paged by `offset` and `limit`.
+        """
+        ranges = self._ranges(query, lo, hi)
+        stop = None if limit is None else offset + limit
+        return list(islice(self._merged(ranges), offset, stop))
+
+    def search(self, query: str, lo: int = 0, hi: int = None) -> dict:
+        """
+        Return {ward id: [matching candidate positions]} for wards [lo, hi)
+        in ward id order; a ward matched only by its own name has an empty
+        list.
+        """
+        hits = {}
+        for ward_id, pos in self._merged(self._ranges(query, lo, hi)):
+            positions = hits.setdefault(ward_id, [])
+            if pos >= 0:
+                positions.append(pos)
+        return hits
+
+
+_indexes = OrderedDict()  # version -> SearchIndex
+_indexes_lock = threading.Lock()
+
+
+def get_index(snap) -> SearchIndex:
+    """
+    The search index for a snapshot's version, built on first use.
+    Building takes most of a second, so it happens outside the lock;
+    if two requests race, the first index published wins.
+    """
+    with _indexes_lock:
+        index = _indexes.get(snap.version)
+    if index is not None:
+        return index
+    built = SearchIndex(snap)
+    with _indexes_lock:
+        index = _indexes.setdefault(snap.version, built)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -0,0 +1,494 @@
+"""
+Compiled Snapshots
+==================
+A binary, columnar form of the results document (`.snap`) that loads
+without parsing JSON, validating wards or hashing them, so a cold start
+costs little more than building the ward records:
+
+    python -m election.snapfile data/sample_data.json   # -> data/sample_data.snap
+
+The file is memory-mapped and its columns are read in place through
+`memoryview.cast()`. Loading decodes only the header and the few columns
+the snapshot's aggregates need (status, leading party, turnout); strings,
+WardRecords and ward dicts are decoded when first asked for, and the full
+document only when something needs all of it (/api/data).
+
+Layout (native byte order, recorded in the header):
+
+    b"JHSNAP01"          magic
+    u32                  header length
+    header               JSON: data version and digests, the document
+                         without its ward lists, the key layouts of ward
+                         and candidate dicts, the source JSON's size and
+                         SHA-1, and a table of columns (typecode, offset,
+                         length)
+    columns              from the next 8-byte boundary: fixed-width arrays,
+                         each 8-byte aligned:
+                           ward.*       one value per ward
+                           candidate.*  one value per candidate
+                           string.*     the string dictionary (offsets +
+                                        UTF-8 data) that every name,
+                                        party, status and label points into
+
+Text fields are stored as indexes into the string dictionary (-1 for
+null), numbers as float64 plus a kind byte (null / int / float) so the
+decoded dicts are identical to the source, and fields the schema does not
+know about as a JSON object in the string dictionary. Keys missing from a
+ward or candidate are recorded by its layout.
+
+DataSource prefers `<name>.snap` over `<name>.json` when both exist and
+the compiled file was made from the JSON file as it is now: the same size
+and either the same mtime as when it was compiled or the same SHA-1.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from .records import (
+    WARD_NUMBER_FIELDS, WARD_TEXT_FIELDS, WardRecord, build_candidates, build_record,
+)
+from .snapshot import Snapshot, WardSummary
+
+MAGIC = b"JHSNAP01"
+FORMAT = 1
+SUFFIX = ".snap"
+ALIGN = 8
+
+WARD_TEXT = ("status",) + WARD_TEXT_FIELDS
+WARD_NUMBERS = WARD_NUMBER_FIELDS
+CANDIDATE_TEXT = ("name", "party")
+CANDIDATE_NUMBERS = ("votes", "pct", "prev_votes")
+_WARD_KNOWN = {"ward_no", "candidates", *WARD_TEXT, *WARD_NUMBERS}
+_CANDIDATE_KNOWN = {*CANDIDATE_TEXT, *CANDIDATE_NUMBERS}
+
+# Kind byte of a number column
+_NULL, _INT, _FLOAT = 0, 1, 2
+_MAX_EXACT_INT = 1 << 53
+
+
+class SnapFileError(ValueError):
+    """The file is not a compiled snapshot this version can read."""
+
+
+def snap_path(json_path: str) -> str:
+    """The compiled snapshot path for a JSON document path."""
+    return os.path.splitext(json_path)[0] + SUFFIX
+
+
+# ---------------------------------------------------------------------------
+# Compiler
+# ---------------------------------------------------------------------------
+class _Strings:
+    def __init__(self):
+        self.ids = {}
+
+    def ref(self, value) -> int:
+        if value is None:
+            return -1
+        return self.ids.setdefault(value, len(self.ids))
+
+
+def _layout(layouts: dict, keys) -> int:
+    return layouts.setdefault(tuple(keys), len(layouts))
+
+
+def _number(values: array, kinds: array, value, where: str):
+    if value is None:
+        values.append(0.0)
+        kinds.append(_NULL)
+    elif isinstance(value, int):
+        if abs(value) > _MAX_EXACT_INT:
+            raise SnapFileError(f"{where}: {value} is too large to store exactly")
+        values.append(float(value))
+        kinds.append(_INT)
+    else:
+        values.append(value)
+        kinds.append(_FLOAT)
+
+
+def compile_document(data: dict, source: bytes = None, source_mtime_ns: int = None) -> bytes:
+    """
+    Compile a results document into the .snap format. The document is
+    validated (SchemaError) and hashed once here, so loading does not have
+    to. `source` is the JSON file's content and `source_mtime_ns` its
+    modification time, recorded for staleness checks.
+    """
+    snap = Snapshot(data)
+    strings = _Strings()
+    ward_layouts, candidate_layouts = {}, {}
+
+    cols = {
+        "ward.municipality": array("I"), "ward.ward_no": array("q"), "ward.layout": array("H"),
+        "ward.extra": array("i"), "ward.digest": array("Q"), "ward.candidates": array("I", [0]),
+        "candidate.layout": array("H"), "candidate.extra": array("i"),
+    }
+    for f in WARD_TEXT:
+        cols[f"ward.{f}"] = array("i")
+    for f in WARD_NUMBERS:
+        cols[f"ward.{f}"], cols[f"ward.{f}.kind"] = array("d"), array("B")
+    for f in CANDIDATE_TEXT:
+        cols[f"candidate.{f}"] = array("i")
+    for f in CANDIDATE_NUMBERS:
+        cols[f"candidate.{f}"], cols[f"candidate.{f}.kind"] = array("d"), array("B")
+
+    municipalities = []
+    for i, m in enumerate(snap.municipalities):
+        # "wards" keeps its place in the municipality's key order
+        municipalities.append({k: (None if k == "wards" else v) for k, v in m.items()})
+        for w in m.get("wards", []):
+            where = f"{m['name']!r} ward {w['ward_no']}"
+            cols["ward.municipality"].append(i)
+            cols["ward.ward_no"].append(w["ward_no"])
+            cols["ward.layout"].append(_layout(ward_layouts, w))
+            cols["ward.digest"].append(snap._ward_digests[(m["name"], w["ward_no"])])
+            extra = {k: v for k, v in w.items() if k not in _WARD_KNOWN}
+            cols["ward.extra"].append(strings.ref(json.dumps(extra, ensure_ascii=False)) if extra else -1)
+            for f in WARD_TEXT:
+                cols[f"ward.{f}"].append(strings.ref(w.get(f)))
+            for f in WARD_NUMBERS:
+                _number(cols[f"ward.{f}"], cols[f"ward.{f}.kind"], w.get(f), f"{where}: {f}")
+            for c in w.get("candidates", []):
+                cols["candidate.layout"].append(_layout(candidate_layouts, c))
+                extra = {k: v for k, v in c.items() if k not in _CANDIDATE_KNOWN}
+                cols["candidate.extra"].append(strings.ref(json.dumps(extra, ensure_ascii=False)) if extra else -1)
+                for f in CANDIDATE_TEXT:
+                    cols[f"candidate.{f}"].append(strings.ref(c.get(f)))
+                for f in CANDIDATE_NUMBERS:
+                    _number(cols[f"candidate.{f}"], cols[f"candidate.{f}.kind"], c.get(f), f"{where}: {f}")
+            cols["ward.candidates"].append(len(cols["candidate.layout"]))
+
+    encoded = [s.encode("utf-8") for s in strings.ids]
+    offsets = array("Q", [0])
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    cols["string.offsets"] = offsets
+    cols["string.data"] = array("B", b"".join(encoded))
+
+    pos = 0
+    layout = {}
+    for name, col in cols.items():
+        layout[name] = [col.typecode, pos, len(col)]
+        pos = _aligned(pos + len(col) * col.itemsize)
+    header = {
+        "format": FORMAT,
+        "byteorder": sys.byteorder,
+        "version": snap.version,
+        "meta_digest": snap._meta_digest,
+        "document": {k: (municipalities if k == "municipalities" else v) for k, v in data.items()},
+        "ward_layouts": [list(k) for k in ward_layouts],
+        "candidate_layouts": [list(k) for k in candidate_layouts],
+        "source": {
+            "size": len(source), "mtime_ns": source_mtime_ns, "sha1": hashlib.sha1(source).hexdigest(),
+        } if source else None,
+        "columns": layout,  # name -> [typecode, offset from the data start, length]
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    out = bytearray(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+    start = _aligned(len(out))
+    for name, col in cols.items():
+        out.extend(b"\0" * (start + layout[name][1] - len(out)))
+        out.extend(col.tobytes())
+    return bytes(out)
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def compile_file(json_path: str, out_path: str = None) -> str:
+    """Compile a JSON results file; returns the written .snap path."""
+    with open(json_path, "rb") as f:
+        source = f.read()
+        mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+    body = compile_document(json.loads(source), source, mtime_ns)
+    out_path = out_path or snap_path(json_path)
+    tmp = f"{out_path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, out_path)  # readers never see a half-written file
+    return out_path
+
+
+# ---------------------------------------------------------------------------
+# Loader
+# ---------------------------------------------------------------------------
+class SnapFile:
+    """A memory-mapped .snap file: its header and zero-copy column views."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise SnapFileError(f"{path}: not a compiled snapshot")
+        (length,) = struct.unpack_from("<I", buf, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(buf[start:start + length]))
+        if self.header.get("format") != FORMAT or self.header.get("byteorder") != sys.byteorder:
+            raise SnapFileError(f"{path}: unsupported snapshot format or byte order")
+        data_start = _aligned(start + length)
+        self.columns = {
+            name: buf[data_start + offset:data_start + offset + count * array(typecode).itemsize].cast(typecode)
+            for name, (typecode, offset, count) in self.header["columns"].items()
+        }
+        self.strings = _StringTable(self.columns["string.offsets"], self.columns["string.data"])
+        self.ward_layouts = [tuple(k) for k in self.header["ward_layouts"]]
+        self.candidate_layouts = [tuple(k) for k in self.header["candidate_layouts"]]
+
+    def __len__(self):
+        return len(self.columns["ward.ward_no"])
+
+    def is_fresh(self, json_path: str) -> bool:
+        """True if this file was compiled from `json_path` as it is now."""
+        source = self.header.get("source")
+        try:
+            st = os.stat(json_path)
+        except OSError:
+            return True  # nothing to be stale against
+        if not source or st.st_size != source["size"]:
+            return False
+        # The JSON's own mtime, unchanged since it was compiled, vouches for
+        # its content; otherwise (edited, or copied into a deploy bundle)
+        # compare the content
+        if st.st_mtime_ns == source.get("mtime_ns"):
+            return True
+        digest = hashlib.sha1()
+        with open(json_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest() == source["sha1"]
+
+    def _texts(self, name: str) -> list:
+        return self.strings.lookup(self.columns[name].tolist())
+
+    def _numbers(self, name: str) -> list:
+        values = self.columns[name].tolist()
+        kinds = bytes(self.columns[f"{name}.kind"])
+        # Columns usually hold one kind (plus nulls); decode those in bulk
+        if _FLOAT not in kinds:
+            values = list(map(int, values))
+        elif _INT in kinds:
+            values = [int(v) if k == _INT else v for v, k in zip(values, kinds)]
+        i = kinds.find(_NULL)
+        while i >= 0:
+            values[i] = None
+            i = kinds.find(_NULL, i + 1)
+        return values
+
+    def summaries(self, municipalities: list) -> list:
+        """WardSummary lists per municipality, in document order, without building records."""
+        statuses = self._texts("ward.status")
+        parties = self._texts("ward.winner_party")
+        turnouts = self._numbers("ward.turnout")
+        offsets = self.columns["ward.candidates"].tolist()
+        top_party = self.columns["candidate.party"]
+        out = [[] for _ in municipalities]
+        for i, (muni, ward_no) in enumerate(zip(self.columns["ward.municipality"].tolist(),
+                                                self.columns["ward.ward_no"].tolist())):
+            # the leader's party as build_record() resolves it
+            party = parties[i] or (
+                self.strings[top_party[offsets[i]]] or "—" if offsets[i] < offsets[i + 1] else "—"
+            )
+            out[muni].append(WardSummary(ward_no, statuses[i], party, turnouts[i] or 0))
+        return out
+
+    def record(self, i: int, muni: dict) -> WardRecord:
+        """The WardRecord of ward `i` (of municipality `muni`)."""
+        col = self.columns
+        w = {"ward_no": col["ward.ward_no"][i]}
+        for f in WARD_TEXT:
+            w[f] = self.strings[col[f"ward.{f}"][i]]
+        for f in WARD_NUMBERS:
+            w[f] = self._number(f"ward.{f}", i)
+        js = range(col["ward.candidates"][i], col["ward.candidates"][i + 1])
+        candidates = build_candidates(
+            *([self.strings[col[f"candidate.{f}"][j]] for j in js] for f in CANDIDATE_TEXT),
+            *([self._number(f"candidate.{f}", j) for j in js] for f in CANDIDATE_NUMBERS),
+        )
+        return build_record(muni, w, tuple(candidates))
+
+    def all_records(self, municipalities: list) -> list:
+        """Every WardRecord in document order, decoded column by column."""
+        cands = build_candidates(*(
+            self._texts(f"candidate.{f}") for f in CANDIDATE_TEXT
+        ), *(self._numbers(f"candidate.{f}") for f in CANDIDATE_NUMBERS))
+        fields = [(f, self._texts(f"ward.{f}")) for f in WARD_TEXT]
+        fields += [(f, self._numbers(f"ward.{f}")) for f in WARD_NUMBERS]
+        names = [f for f, _ in fields]
+        offsets = self.columns["ward.candidates"].tolist()
+        ward_nos = self.columns["ward.ward_no"].tolist()
+
+        rows = []
+        for i, (muni, values) in enumerate(zip(self.columns["ward.municipality"].tolist(),
+                                               zip(*(v for _, v in fields)))):
+            w = dict(zip(names, values))
+            w["ward_no"] = ward_nos[i]
+            rows.append(build_record(
+                municipalities[muni], w, tuple(cands[offsets[i]:offsets[i + 1]]),
+            ))
+        return rows
+
+    def digests(self, municipalities: list) -> dict:
+        names = [m["name"] for m in municipalities]
+        return {
+            (names[m], no): d for m, no, d in zip(
+                self.columns["ward.municipality"].tolist(),
+                self.columns["ward.ward_no"].tolist(),
+                self.columns["ward.digest"].tolist(),
+            )
+        }
+
+    def _number(self, name: str, i: int):
+        kind = self.columns[f"{name}.kind"][i]
+        value = self.columns[name][i]
+        return None if kind == _NULL else int(value) if kind == _INT else value
+
+    def _value(self, prefix: str, field: str, i: int, extra):
+        if field in extra:
+            return extra[field]
+        col = self.columns[f"{prefix}.{field}"]
+        if col.format == "i":
+            return self.strings[col[i]]
+        return self._number(f"{prefix}.{field}", i)
+
+    def _extra(self, prefix: str, i: int) -> dict:
+        ref = self.columns[f"{prefix}.extra"][i]
+        return json.loads(self.strings[ref]) if ref >= 0 else {}
+
+    def candidate_doc(self, j: int) -> dict:
+        extra = self._extra("candidate", j)
+        return {
+            k: self._value("candidate", k, j, extra)
+            for k in self.candidate_layouts[self.columns["candidate.layout"][j]]
+        }
+
+    def ward_doc(self, i: int) -> dict:
+        """Decode ward `i` into the dict it was compiled from."""
+        extra = self._extra("ward", i)
+        doc = {}
+        for k in self.ward_layouts[self.columns["ward.layout"][i]]:
+            if k == "ward_no":
+                doc[k] = self.columns["ward.ward_no"][i]
+            elif k == "candidates":
+                offsets = self.columns["ward.candidates"]
+                doc[k] = [self.candidate_doc(j) for j in range(offsets[i], offsets[i + 1])]
+            else:
+                doc[k] = self._value("ward", k, i, extra)
+        return doc
+
+    def snapshot(self) -> Snapshot:
+        """
+        Build the Snapshot from the columns that the aggregates need; ward
+        records and dicts are built when first read.
+        """
+        layout = self.header["document"]
+        municipalities = [{k: v for k, v in m.items() if k != "wards"} for m in layout["municipalities"]]
+        return Snapshot.from_records(
+            layout, municipalities, self.summaries(municipalities),
+            WardRecords(self, municipalities), WardDocs(self), self.digests(municipalities),
+            self.header["meta_digest"], self.header["version"],
+        )
+
+
+class _StringTable:
+    """The string dictionary, each string decoded on first use (-1: None)."""
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+        self._decoded = {-1: None}
+
+    def __getitem__(self, i: int):
+        try:
+            return self._decoded[i]
+        except KeyError:
+            offsets = self._offsets
+            value = self._decoded[i] = str(self._data[offsets[i]:offsets[i + 1]], "utf-8")
+            return value
+
+    def lookup(self, refs: list) -> list:
+        """The strings for a list of indexes, decoding the missing ones once."""
+        decoded, offsets, data = self._decoded, self._offsets, self._data
+        for i in set(refs).difference(decoded):
+            decoded[i] = str(data[offsets[i]:offsets[i + 1]], "utf-8")
+        return [decoded[i] for i in refs]
+
+
+class _LazyItems(Sequence):
+    """Items of a SnapFile built on first access and kept."""
+
+    def __init__(self, snapfile):
+        self._file = snapfile
+        self._items = [None] * len(snapfile)
+
+    def _build(self, i: int):
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._items)))]
+        item = self._items[i]
+        if item is None:
+            if i < 0:
+                i += len(self._items)
+            item = self._items[i] = self._build(i)
+        return item
+
+    def peek(self, i: int):
+        """The item at `i` if it is already built, else None (never builds it)."""
+        return self._items[i]
+
+
+class WardRecords(_LazyItems):
+    """The WardRecords of a SnapFile; iterating builds the rest in bulk."""
+
+    def __init__(self, snapfile, municipalities: list):
+        super().__init__(snapfile)
+        self._munis = municipalities
+
+    def _build(self, i: int):
+        return self._file.record(i, self._munis[self._file.columns["ward.municipality"][i]])
+
+    def __iter__(self):
+        if None in self._items:
+            built = self._file.all_records(self._munis)
+            # keep records already handed out, so they stay the same objects
+            self._items = [r if r is not None else b for r, b in zip(self._items, built)]
+        return iter(self._items)
+
+
+class WardDocs(_LazyItems):
+    """The ward dicts of a SnapFile, decoded on first access and kept."""
+
+    def _build(self, i: int):
+        return self._file.ward_doc(i)
+
+
+def load(path: str) -> Snapshot:
+    """Load a compiled snapshot file as a Snapshot."""
+    return SnapFile(path).snapshot()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile a results JSON file into a .snap file")
+    parser.add_argument("json_path")
+    parser.add_argument("-o", "--output", help="output path (default: next to the JSON file)")
+    args = parser.parse_args(argv)
+    out = compile_file(args.json_path, args.output)
+    print(f"{out}: {os.path.getsize(out):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
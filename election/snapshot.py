@@ -0,0 +1,533 @@
+"""
+Results Snapshot
+================
+A read-only, precomputed view of one version of the results document.
+
+Both entry points (the Streamlit app and the Vercel API) read from a
+Snapshot instead of re-scanning the ward list on every rerun or request:
+the flattened ward table, party/municipality aggregates and the
+per-municipality indexes are built once, in a single O(wards) pass, and
+shared until the data version changes.
+
+When only a few wards change, `Snapshot.apply()` derives the next
+snapshot from the previous one, so the cost of an update scales with the
+number of changed wards rather than with the size of the state.
+
+Wards are validated and turned into compact WardRecords (records.py)
+while the snapshot is built, so a malformed document raises SchemaError
+here instead of failing somewhere in the render path.
+
+This module only uses the standard library so the serverless API can
+import it without pulling in pandas; the typed DataFrames used by the
+dashboard (see frames.py) are built lazily on first access.
+"""
+
+import copy
+import hashlib
+import itertools
+import json
+import threading
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from . import metrics
+from .records import check_document, ward_record
+
+# Feed timestamps are published in Indian Standard Time without an offset
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
+
+_MASK = (1 << 64) - 1
+_serials = itertools.count(1)  # Snapshot.serial: later snapshots compare greater
+
+
+def _digest(obj) -> int:
+    """64-bit content hash of a JSON-serializable value."""
+    payload = json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return int.from_bytes(hashlib.sha1(payload).digest()[:8], "big")
+
+
+def _meta_digest(data: dict) -> int:
+    """Hash of everything in the document except the ward lists."""
+    munis = [{k: v for k, v in m.items() if k != "wards"} for m in data.get("municipalities", [])]
+    return _digest({**data, "municipalities": munis})
+
+
+def _ward_digests(data: dict, previous: "Snapshot" = None) -> dict:
+    """
+    (municipality, ward no.) -> content hash, for every ward. Wards equal
+    to their doc in `previous` reuse its hash: comparing dicts is much
+    cheaper than serializing and hashing them.
+    """
+    old = _docs_in_memory(previous) if previous is not None else {}
+    digests = previous._ward_digests if previous is not None else None
+    out = {}
+    for m in data.get("municipalities", []):
+        name = m["name"]
+        for w in m.get("wards", []):
+            key = (name, w["ward_no"])
+            prev = old.get(key)
+            out[key] = digests[key] if prev is not None and prev == w else _digest(w)
+    return out
+
+
+def _docs_in_memory(snap: "Snapshot") -> dict:
+    """
+    (municipality, ward no.) -> ward doc of `snap`, for the docs already in
+    memory: a compiled snapshot's docs are not decoded just to compare them.
+    """
+    if snap._data is not None:
+        return {
+            (m["name"], w["ward_no"]): w
+            for m in snap._data.get("municipalities", [])
+            for w in m.get("wards", [])
+        }
+    docs = snap.ward_docs
+    peek = docs.__getitem__ if type(docs) is list else docs.peek
+    return {key: doc for key, i in snap.ward_ids.items() if (doc := peek(i)) is not None}
+
+
+def _format_version(last_updated: str, meta: int, ward_sum: int) -> str:
+    return f"{last_updated}-{(meta + ward_sum) & _MASK:016x}"
+
+
+def data_version(data: dict) -> str:
+    """
+    Return a stable version string for a results document.
+    Ward hashes are combined by addition so the version can be updated
+    incrementally when individual wards change.
+    """
+    ward_sum = sum(_ward_digests(data).values()) & _MASK
+    return _format_version(data.get("last_updated", ""), _meta_digest(data), ward_sum)
+
+
+class WardSummary(NamedTuple):
+    """The fields of a ward the snapshot's aggregates need (see from_records)."""
+
+    ward_no: int
+    status: str
+    party: str
+    turnout: float
+
+
+class _Overlay(Sequence):
+    """A sequence with some items replaced, over an unchanged (lazy) base."""
+
+    def __init__(self, base, updates: dict):
+        if isinstance(base, _Overlay):
+            base, updates = base._base, {**base._updates, **updates}
+        self._base = base
+        self._updates = updates
+
+    def __len__(self):
+        return len(self._base)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return self._updates[i] if i in self._updates else self._base[i]
+
+    def __iter__(self):
+        updates = self._updates
+        for i, item in enumerate(self._base):  # the base's own (bulk) iteration
+            yield updates[i] if i in updates else item
+
+    def peek(self, i: int):
+        """The item at `i` if it is in memory, else None (see _LazyItems.peek)."""
+        if i in self._updates:
+            return self._updates[i]
+        return self._base[i] if type(self._base) is list else self._base.peek(i)
+
+
+def _replaced(seq, updates: dict):
+    """`seq` with the items at the keys of `updates` replaced (a copy)."""
+    if type(seq) is not list:
+        return _Overlay(seq, updates)  # do not materialize a lazy sequence
+    seq = list(seq)
+    for i, item in updates.items():
+        seq[i] = item
+    return seq
+
+
+class _WardIndex(Mapping):
+    """(municipality, ward no.) -> WardRecord, a view over ward_ids and wards."""
+
+    def __init__(self, ward_ids: dict, wards):
+        self._ids = ward_ids
+        self._wards = wards
+
+    def __getitem__(self, key):
+        return self._wards[self._ids[key]]
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class _MuniWards(Mapping):
+    """Municipality name -> its WardRecords sorted by ward no. (a view)."""
+
+    def __init__(self, muni_ward_ids: dict, wards):
+        self._ids = muni_ward_ids
+        self._wards = wards
+
+    def __getitem__(self, name):
+        wards = self._wards
+        return [wards[i] for i in self._ids[name]]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class Snapshot:
+    """Flattened wards, aggregates and indexes for one data version."""
+
+    def __init__(self, data: dict, version: str = None, digests: dict = None):
+        if digests is None:
+            check_document(data)  # next_snapshot checks before computing digests
+            digests = _ward_digests(data)
+        self._start(data, digests, _meta_digest(data), version)
+        party_seats = {}
+        for m in self.municipalities:
+            wards = m.get("wards", [])
+            rows = [ward_record(m, w) for w in wards]
+            self._add_municipality(m, rows, party_seats)
+            self.wards.extend(rows)
+            self.ward_docs.extend(wards)
+        self._finish(party_seats)
+
+    @classmethod
+    def from_records(cls, layout: dict, municipalities: list, summaries: list, wards, ward_docs,
+                     digests: dict, meta_digest: int, version: str) -> "Snapshot":
+        """
+        Build a snapshot from an already validated document without
+        touching its wards, as loaded from a compiled snapshot file (see
+        snapfile.py). `municipalities` are the municipality dicts without
+        their ward lists, `summaries` one list of WardSummary per
+        municipality in document order, and
+        `wards` / `ward_docs` sequences of the WardRecords and ward dicts
+        that build each item on first access. `layout` is the document
+        with placeholder ward lists; `data` is assembled from it and
+        `ward_docs` when first read.
+        """
+        snap = cls.__new__(cls)
+        snap._start({**layout, "municipalities": municipalities}, digests, meta_digest, version)
+        snap._data = None
+        snap._layout = layout
+        snap.wards = wards
+        snap.ward_docs = ward_docs
+        snap.ward_index = _WardIndex(snap.ward_ids, wards)
+        snap.wards_by_muni = _MuniWards(snap.muni_ward_ids, wards)
+        party_seats = {}
+        for m, rows in zip(municipalities, summaries):
+            snap._add_municipality(m, rows, party_seats)
+        snap._finish(party_seats)
+        return snap
+
+    def _start(self, data: dict, digests: dict, meta_digest: int, version: str):
+        self._data = data        # the document; None until assembled (see `data`)
+        self._layout = data      # key order and non-ward values of the document
+        self.summary = data.get("summary", {})
+        self.last_updated = data.get("last_updated", "")
+        self.municipalities = data.get("municipalities", [])
+
+        self.wards = []          # every WardRecord, in document order
+        self.ward_docs = []      # the document's ward dicts, parallel to wards
+        self.muni_by_name = {}   # name -> municipality dict
+        self.ward_ids = {}       # (name, ward no.) -> ward id (position in wards/frame)
+        self.muni_ward_ids = {}  # name -> ward ids sorted by ward no.
+        self.ward_index = _WardIndex(self.ward_ids, self.wards)         # (name, ward no.) -> WardRecord
+        self.wards_by_muni = _MuniWards(self.muni_ward_ids, self.wards)  # name -> WardRecords by ward no.
+        self.muni_progress = []  # per-municipality declared/total rows
+        self.party_seats = {}    # party -> declared seats, most seats first
+        self.declared_count = 0
+        self.avg_turnout = 0.0
+
+        self.declared_by_muni = {}  # name -> declared wards
+        self._turnout_sum = 0.0
+        self._meta_digest = meta_digest
+        self._ward_digests = digests
+        self._ward_digest_sum = sum(digests.values()) & _MASK
+        self.version = version or _format_version(
+            self.last_updated, self._meta_digest, self._ward_digest_sum
+        )
+
+        self._tables = None      # (wards, candidates, offsets), see frames.py
+        self._lock = threading.Lock()
+        self.serial = next(_serials)
+
+    def _add_municipality(self, m: dict, rows: list, party_seats: dict):
+        """
+        Index one municipality's wards (in document order). `rows` only
+        need ward_no, status, party and turnout.
+        """
+        name = m["name"]
+        self.muni_by_name[name] = m
+        start = len(self.ward_ids)
+        dec = 0
+        for i, row in enumerate(rows, start):
+            self.ward_ids[(name, row.ward_no)] = i
+            self._turnout_sum += row.turnout
+            if row.status == "Declared":
+                dec += 1
+                party_seats[row.party] = party_seats.get(row.party, 0) + 1
+        self.muni_ward_ids[name] = sorted(
+            range(start, start + len(rows)), key=lambda i: rows[i - start].ward_no,
+        )
+        self.declared_by_muni[name] = dec
+        self.declared_count += dec
+
+    @property
+    def data(self) -> dict:
+        """The results document (assembled on first use for compiled snapshots)."""
+        if self._data is None:
+            self._data = self._document()
+        return self._data
+
+    def _document(self) -> dict:
+        """The document in `_layout`'s key order, with the current ward dicts."""
+        munis, start = [], 0
+        for m in self._layout.get("municipalities", []):
+            count = len(self.muni_ward_ids[m["name"]])
+            wards = self.ward_docs[start:start + count]
+            munis.append({k: (wards if k == "wards" else v) for k, v in m.items()})
+            start += count
+        return {k: (munis if k == "municipalities" else v) for k, v in self._layout.items()}
+
+    def _finish(self, party_seats: dict):
+        """Derive the ordered/averaged aggregates from the running totals."""
+        self.muni_progress = []
+        for m in self.municipalities:
+            dec = self.declared_by_muni[m["name"]]
+            total = m["total_wards"]
+            self.muni_progress.append({
+                "name": m["name"],
+                "type": m.get("type", ""),
+                "total_wards": total,
+                "declared": dec,
+                "progress": f"{dec}/{total}",
+                "pct_complete": round(dec / total * 100, 1) if total else 0,
+            })
+        self.party_seats = dict(
+            sorted(((p, n) for p, n in party_seats.items() if n), key=lambda x: -x[1])
+        )
+        self.avg_turnout = self._turnout_sum / len(self.wards) if self.wards else 0.0
+
+    # -----------------------------------------------------------------------
+    # Incremental updates
+    # -----------------------------------------------------------------------
+    def apply(self, changes, data: dict = None, updates: dict = None) -> "Snapshot":
+        """
+        Return a new snapshot with ward-level `changes` applied.
+
+        `changes` is an iterable of (municipality name, ward dict) pairs for
+        wards that already exist. `data` is the new full document if the
+        caller has it; otherwise the new document is this one with the
+        changed wards and the top-level `updates` (e.g. last_updated)
+        replaced, assembled only when `data` is first read. Wards being
+        added or removed, or a municipality changing its type, fall back
+        to a full rebuild.
+        """
+        changes = [(name, w) for name, w in changes]
+        updates = updates or {}
+        if data is None:
+            if any((name, w.get("ward_no")) not in self.ward_ids for name, w in changes):
+                return Snapshot(self._patched_document(changes, updates))
+            layout = {**self._layout, **updates}
+            munis, muni_by_name = self.municipalities, self.muni_by_name
+        else:
+            layout = data
+            munis = data.get("municipalities", [])
+            muni_by_name = {m["name"]: m for m in munis}
+            if muni_by_name.keys() != self.muni_by_name.keys() or any(
+                m.get("type", "") != self.muni_by_name[m["name"]].get("type", "") for m in munis
+            ) or any((name, w.get("ward_no")) not in self.ward_ids for name, w in changes) or (
+                sum(len(m.get("wards", [])) for m in munis) != len(self.wards)
+            ):
+                return Snapshot(data)
+
+        new = copy.copy(self)
+        new._data = data
+        new._layout = layout
+        new.summary = layout.get("summary", {})
+        new.last_updated = layout.get("last_updated", "")
+        new.municipalities = munis
+        new.muni_by_name = muni_by_name
+        new.declared_by_muni = dict(self.declared_by_muni)
+        new._ward_digests = dict(self._ward_digests)
+        party_seats = dict(self.party_seats)
+
+        rows, docs = {}, {}
+        for name, w in changes:
+            key = (name, w["ward_no"])
+            i = self.ward_ids[key]
+            old = rows.get(i) or self.wards[i]
+            row = rows[i] = ward_record(muni_by_name[name], w)
+            docs[i] = w
+
+            digest = _digest(w)
+            new._ward_digest_sum = (
+                new._ward_digest_sum - new._ward_digests[key] + digest
+            ) & _MASK
+            new._ward_digests[key] = digest
+
+            new._turnout_sum += row.turnout - old.turnout
+            for r, sign in ((old, -1), (row, 1)):
+                if r.status == "Declared":
+                    new.declared_by_muni[name] += sign
+                    new.declared_count += sign
+                    party_seats[r.party] = party_seats.get(r.party, 0) + sign
+        new.wards = _replaced(self.wards, rows)
+        new.ward_docs = _replaced(self.ward_docs, docs)
+        new.ward_index = _WardIndex(new.ward_ids, new.wards)
+        new.wards_by_muni = _MuniWards(new.muni_ward_ids, new.wards)
+
+        new._meta_digest = _meta_digest(layout)
+        new.version = _format_version(new.last_updated, new._meta_digest, new._ward_digest_sum)
+        new._finish(party_seats)
+        new._tables = None
+        new._lock = threading.Lock()
+        new.serial = next(_serials)
+        return new
+
+    def _patched_document(self, changes, updates: dict = None) -> dict:
+        """Copy-on-write document with the changed wards and `updates` replaced."""
+        by_muni = {}
+        for name, w in changes:
+            by_muni.setdefault(name, {})[w["ward_no"]] = w
+
+        doc = dict(self.data)
+        munis = list(doc.get("municipalities", []))
+        for i, m in enumerate(munis):
+            wards_by_no = by_muni.get(m["name"])
+            if wards_by_no:
+                wards = [wards_by_no.pop(w["ward_no"], w) for w in m.get("wards", [])]
+                # wards not present before are appended (forces a rebuild)
+                wards.extend(wards_by_no.values())
+                munis[i] = {**m, "wards": wards}
+        doc["municipalities"] = munis
+        doc.update(updates or {})
+        return doc
+
+    def changed_wards(self, data: dict, digests: dict = None):
+        """
+        Return the (municipality, ward) pairs in `data` whose content differs
+        from this snapshot, or None if the set of wards itself changed.
+        """
+        if digests is None:
+            digests = _ward_digests(data)
+        if digests.keys() != self._ward_digests.keys():
+            return None
+        changed = {k for k, d in digests.items() if self._ward_digests[k] != d}
+        if not changed:
+            return []
+        return [
+            (m["name"], w)
+            for m in data.get("municipalities", [])
+            for w in m.get("wards", [])
+            if (m["name"], w["ward_no"]) in changed
+        ]
+
+    # -----------------------------------------------------------------------
+    # Derived views
+    # -----------------------------------------------------------------------
+    @property
+    def updated_at(self):
+        """`last_updated` as an aware datetime (IST if no offset), or None."""
+        try:
+            ts = datetime.fromisoformat(self.last_updated)
+        except (TypeError, ValueError):
+            return None
+        return ts if ts.tzinfo else ts.replace(tzinfo=IST)
+
+    @property
+    def total_wards(self) -> int:
+        """Total wards as published in the summary, else summed per ULB."""
+        return self.summary.get(
+            "total_wards", sum(m["total_wards"] for m in self.municipalities)
+        )
+
+    def _get_tables(self):
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    from .frames import build_candidate_frame, build_ward_frame
+                    with metrics.timer("frames_build"):
+                        candidates, offsets = build_candidate_frame(self.wards)
+                        self._tables = (build_ward_frame(self.wards), candidates, offsets)
+        return self._tables
+
+    @property
+    def frame(self):
+        """The typed ward table, indexed by ward id (built once, on first use)."""
+        return self._get_tables()[0]
+
+    @property
+    def candidates(self):
+        """The candidate table, one row per candidate, sorted by ward id."""
+        return self._get_tables()[1]
+
+    def muni_frame(self, name: str):
+        """Ward table rows of one municipality, sorted by ward no."""
+        return self.frame.iloc[self.muni_ward_ids[name]]
+
+    def ward_candidates(self, ward_id: int):
+        """Candidates of one ward, as a slice of the candidate table."""
+        _, candidates, offsets = self._get_tables()
+        return candidates.iloc[offsets[ward_id]:offsets[ward_id + 1]]
+
+
+def next_snapshot(current: Snapshot, data: dict) -> Snapshot:
+    """
+    Return the snapshot for `data`: `current` itself if nothing changed,
+    an incremental update of it if only ward contents changed, or a fresh
+    build otherwise.
+    """
+    check_document(data)
+    if current is None:
+        metrics.inc("snapshot_updates", kind="full")
+        return Snapshot(data)
+    digests = _ward_digests(data, current)
+    changes = current.changed_wards(data, digests)
+    if changes is None:
+        metrics.inc("snapshot_updates", kind="full")
+        return Snapshot(data, digests=digests)
+    if not changes and _meta_digest(data) == current._meta_digest:
+        metrics.inc("snapshot_updates", kind="unchanged")
+        return current
+    metrics.inc("snapshot_updates", kind="incremental")
+    metrics.inc("wards_changed", len(changes))
+    return current.apply(changes, data)
+
+
+# ---------------------------------------------------------------------------
+# Shared per-process snapshot
+# ---------------------------------------------------------------------------
+_current = None
+_current_lock = threading.Lock()
+
+
+def get_snapshot(data: dict) -> Snapshot:
+    """
+    Return the Snapshot for `data`, reusing the current one when the
+    document is the same object or has the same content, and updating it
+    incrementally when only some wards changed.
+    """
+    global _current
+    snap = _current
+    if snap is not None and snap._data is data:
+        return snap
+
+    with _current_lock:
+        _current = next_snapshot(_current, data)
+        return _current
@@ -0,0 +1,345 @@
+"""
+Reloadable Data Source
+======================
+Keeps the current results Snapshot for a long-lived process (a warm
+Vercel instance, a local server, the Streamlit app) and swaps in a new
+one when the data changes, without a redeploy.
+
+  - Local file: reloaded when its mtime or size changes. An up-to-date
+    compiled snapshot next to it (`<name>.snap`, see `snapfile`) is
+    memory-mapped instead of parsing the JSON.
+  - ELECTION_DATA_URL: re-fetched over a persistent HTTP connection with
+    conditional requests (If-None-Match / If-Modified-Since), so an
+    unchanged feed costs a 304 and no parsing.
+  - ELECTION_DELTA_URL (optional): once a full document is loaded, only
+    the wards changed since `last_updated` are fetched and applied.
+
+A changed document is turned into the next snapshot incrementally when
+only ward contents changed (see `Snapshot.apply`).
+
+Parse and snapshot-build durations, reload outcomes and the age of the
+loaded data are recorded in `metrics` (see `register_gauges`).
+
+Checks run at most once per ELECTION_RELOAD_INTERVAL seconds (default 5),
+either inline in `get()` (serverless: no threads survive between
+requests) or, after `start()`, in one background thread per process with
+exponential backoff on failures. In both modes only one reload runs at a
+time and readers keep getting the last good snapshot until the next one
+is fully parsed and published.
+"""
+
+import gzip
+import http.client
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from . import metrics, snapfile
+from .delta import DeltaMismatch, apply_delta, delta_request_url, load_feed
+from .snapshot import Snapshot, next_snapshot
+from .stream import load_document
+
+DEFAULT_RELOAD_INTERVAL = 5.0
+FETCH_TIMEOUT = 10
+MAX_BACKOFF = 120.0
+
+
+def _parse(stream, source: str, parse=None):
+    """Parse a document (or, with `parse`, a feed body), timing it as `parse`."""
+    with metrics.timer("parse", source=source):
+        if parse is not None:
+            return parse(stream.read())
+        return load_document(stream)
+
+
+class HttpFetcher:
+    """GET one URL repeatedly over a kept-alive connection, with validators."""
+
+    def __init__(self, url: str, timeout: float = FETCH_TIMEOUT):
+        self.url = url
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout = timeout
+        self.etag = None
+        self.last_modified = None
+        self._conn = None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(self.netloc, timeout=self.timeout)
+        return self._conn
+
+    def _request(self, target: str, headers: dict):
+        # A kept-alive connection may have been closed by the server while
+        # idle; retry once on a fresh connection before giving up.
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request("GET", target, headers=headers)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError):
+                self.close()
+                if attempt == 2:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+    def fetch(self, parse, target: str = None, conditional: bool = True):
+        """
+        GET the URL (or `target` on the same host) and return `parse(stream)`,
+        or None if the server answered 304 Not Modified. Validators are only
+        remembered for the main URL, not for other targets.
+        """
+        headers = {"Accept-Encoding": "gzip"}
+        if conditional:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        resp = self._request(target or self.target, headers)
+        try:
+            if resp.status == 304:
+                resp.read()
+                return None
+            if resp.status != 200:
+                raise OSError(f"HTTP {resp.status} from {self.url}")
+            if resp.getheader("Content-Encoding") == "gzip":
+                stream = gzip.GzipFile(fileobj=resp)
+                result = parse(stream)
+                stream.read()
+            else:
+                result = parse(resp)
+            resp.read()  # drain so the connection can be reused
+        except Exception:
+            self.close()
+            raise
+        if resp.will_close:
+            self.close()
+        if target is None:
+            self.etag = resp.getheader("ETag")
+            self.last_modified = resp.getheader("Last-Modified")
+        return result
+
+
+class DataSource:
+    """Results source backed by the first existing file in `paths` or a URL."""
+
+    def __init__(self, paths=(), url: str = None, min_interval: float = None,
+                 delta_url: str = None):
+        self.paths = [os.path.normpath(p) for p in paths]
+        self.url = url
+        self.delta_url = delta_url
+        if min_interval is None:
+            min_interval = float(os.getenv("ELECTION_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL))
+        self.min_interval = min_interval
+
+        self.snapshot = None      # last good snapshot, replaced atomically
+        self.error = None         # last load error, kept for diagnostics
+        self._fingerprint = None  # (path, mtime, size) of the loaded file, or "url"
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._http = HttpFetcher(url) if url else None
+        self._delta_http = HttpFetcher(delta_url) if delta_url else None
+        self.loaded_at = None     # time.time() when the current snapshot was published
+        self._thread = None
+        self._ready = threading.Event()
+        self._listeners = []
+
+    @classmethod
+    def from_env(cls, paths=()):
+        """Build a source that prefers ELECTION_DATA_URL over local files."""
+        return cls(
+            paths=paths,
+            url=os.getenv("ELECTION_DATA_URL") or None,
+            delta_url=os.getenv("ELECTION_DELTA_URL") or None,
+        )
+
+    def get(self) -> Snapshot:
+        """
+        Return the current snapshot, reloading first if a check is due.
+        Returns None only if nothing has ever loaded successfully.
+        """
+        if self._thread is not None:
+            # Background mode never reloads on the caller's thread; only the
+            # very first caller waits, and only until the first attempt ends.
+            if self.snapshot is None:
+                self._ready.wait(FETCH_TIMEOUT)
+            return self.snapshot
+
+        if time.monotonic() - self._checked_at < self.min_interval and self.snapshot:
+            return self.snapshot
+
+        # Single flight: if another thread is reloading, serve what we have.
+        # With nothing loaded yet there is nothing to serve, so wait for it.
+        if not self._lock.acquire(blocking=self.snapshot is None):
+            return self.snapshot
+        try:
+            if time.monotonic() - self._checked_at >= self.min_interval or not self.snapshot:
+                self._checked_at = time.monotonic()
+                self.reload()
+        finally:
+            self._lock.release()
+        return self.snapshot
+
+    @property
+    def background(self) -> bool:
+        """True once `start()` has moved reloads to the background thread."""
+        return self._thread is not None
+
+    def subscribe(self, listener):
+        """Call `listener(old, new)` whenever a new snapshot is published."""
+        self._listeners.append(listener)
+        return listener
+
+    def register_gauges(self):
+        """Export the age of the current data as `metrics` gauges."""
+        def data_age():
+            snap = self.snapshot
+            updated = snap.updated_at if snap is not None else None
+            return time.time() - updated.timestamp() if updated is not None else None
+
+        def loaded_age():
+            return time.time() - self.loaded_at if self.loaded_at is not None else None
+
+        metrics.gauge("data_age_seconds", data_age, "Seconds since the loaded data's last_updated")
+        metrics.gauge("data_loaded_age_seconds", loaded_age, "Seconds since the current snapshot was published")
+        metrics.gauge("data_load_error", lambda: 1 if self.error else 0, "1 if the last reload check failed")
+        return self
+
+    def start(self):
+        """Poll for new data in a daemon thread instead of inline in `get()`."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="results-fetcher", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def refresh(self) -> bool:
+        """Run a reload check now, regardless of the reload interval."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            return self.reload()
+
+    def _run(self):
+        failures = 0
+        while True:
+            ok = self.refresh()
+            self._ready.set()
+            failures = 0 if ok else failures + 1
+            delay = min(self.min_interval * 2 ** failures, MAX_BACKOFF)
+            time.sleep(delay * random.uniform(0.9, 1.1))
+
+    def reload(self) -> bool:
+        """
+        Load the data if it changed since the last check; keep the old
+        snapshot on error. Returns True if the check succeeded.
+        """
+        source = "url" if self.url else "file"
+        try:
+            if self.delta_url and self.snapshot:
+                try:
+                    with metrics.timer("reload", source="delta"):
+                        self._reload_delta()
+                    self.error = None
+                    metrics.inc("reloads", source="delta", result="ok")
+                    return True
+                except (DeltaMismatch, OSError, ValueError, KeyError, http.client.HTTPException):
+                    metrics.inc("reloads", source="delta", result="error")
+                    # fall back to a full reload below
+            with metrics.timer("reload", source=source):
+                if self.url:
+                    self._reload_url()
+                else:
+                    self._reload_file()
+            self.error = None
+            metrics.inc("reloads", source=source, result="ok")
+            return True
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            metrics.inc("reloads", source=source, result="error")
+            # Never fall back to the bundled file here: demo data must not be
+            # served, or diffed to listeners, as if it were live results.
+            return False
+
+    def _reload_file(self):
+        path = next((p for p in self.paths if os.path.isfile(p)), None)
+        if path is None:
+            raise FileNotFoundError(f"Data file not found, searched: {self.paths}")
+        st = os.stat(path)
+        compiled = snapfile.snap_path(path)
+        cst = os.stat(compiled) if os.path.isfile(compiled) else None
+        fingerprint = (path, st.st_mtime_ns, st.st_size,
+                       cst and (cst.st_mtime_ns, cst.st_size))
+        if fingerprint == self._fingerprint and self.snapshot:
+            return
+        if cst is not None and self._load_compiled(path, compiled, fingerprint):
+            return
+        with open(path, "rb") as f:
+            data = _parse(f, "file")
+        self._publish(data, fingerprint)
+
+    def _load_compiled(self, path: str, compiled: str, fingerprint) -> bool:
+        """Publish the compiled snapshot of `path` if it is up to date."""
+        try:
+            with metrics.timer("parse", source="snap"):
+                f = snapfile.SnapFile(compiled)
+                if not f.is_fresh(path):
+                    return False
+                snap = f.snapshot()
+        except (OSError, ValueError):
+            return False  # unreadable or from another format version: use the JSON
+        if self.snapshot is not None and self.snapshot.version == snap.version:
+            metrics.inc("snapshot_updates", kind="unchanged")
+            snap = self.snapshot
+        else:
+            metrics.inc("snapshot_updates", kind="compiled")
+        self._set_snapshot(snap)
+        self._fingerprint = fingerprint
+        return True
+
+    def _reload_url(self):
+        data = self._http.fetch(lambda stream: _parse(stream, "url"),
+                                conditional=self._fingerprint == "url")
+        if data is None:
+            return  # 304 Not Modified
+        # unchanged content keeps the current snapshot (see next_snapshot)
+        self._publish(data, "url")
+
+    def _reload_delta(self):
+        target = urlsplit(delta_request_url(self.delta_url, self.snapshot.last_updated))
+        feed = self._delta_http.fetch(
+            lambda stream: _parse(stream, "delta", load_feed),
+            target=f"{target.path or '/'}?{target.query}",
+            conditional=False,
+        )
+        self._set_snapshot(apply_delta(self.snapshot, feed))
+
+    def _publish(self, data: dict, fingerprint):
+        with metrics.timer("snapshot_build"):
+            snap = next_snapshot(self.snapshot, data)
+        self._set_snapshot(snap)
+        self._fingerprint = fingerprint
+
+    def _set_snapshot(self, snap: Snapshot):
+        old, self.snapshot = self.snapshot, snap
+        if snap is not old:
+            self.loaded_at = time.time()
+            for listener in self._listeners:
+                try:
+                    listener(old, snap)
+                except Exception:
+                    pass  # a broken listener must not stop reloads
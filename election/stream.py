@@ -0,0 +1,190 @@
+"""
+Streaming JSON Loader
+=====================
+Parses a results document incrementally from a file or HTTP response.
+
+`json.loads(resp.read().decode())` keeps the raw bytes, the decoded
+string and the parsed tree alive at the same time. Here the input is read
+in fixed-size chunks and only one municipality's worth of text is
+buffered at a time: the top-level object and the municipalities array are
+walked by hand, and each value below them (a municipality with its wards,
+the summary) is decoded with the C decoder as soon as it is complete.
+Peak memory is the parsed tree plus the largest municipality,
+independent of the size of the whole input.
+
+Each municipality is decoded in one call so the decoder's key memo is
+shared across its wards; decoding each ward separately would allocate a
+fresh copy of every key.
+
+The document is not validated here; DataSource runs check_document() on
+the result as it would on json.load()'s. `iter_wards()` exposes the same
+walk as a stream of (municipality, ward) pairs for consumers that do not
+need the document itself.
+"""
+
+import io
+import json
+
+from .records import SchemaError
+
+CHUNK_SIZE = 256 * 1024
+_WHITESPACE = " \t\n\r"
+_AFTER_NUMBER = frozenset(",}]" + _WHITESPACE)  # what may follow a complete number
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """A text buffer over a stream that refills on demand."""
+
+    def __init__(self, fp, chunk_size: int):
+        if isinstance(fp, io.TextIOBase):
+            self.fp = fp
+        else:
+            self.fp = io.TextIOWrapper(fp, encoding="utf-8")
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        chunk = self.fp.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise json.JSONDecodeError(f"Expecting {ch!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number cut by the buffer edge decodes as its prefix ("1."
+                # as 1, "12" of "12345"): only trust it once a delimiter
+                # follows. Every other value ends in its own closing token.
+                if type(obj) not in (int, float):
+                    self.pos = end
+                    return obj
+                if end < len(self.buf):
+                    if self.buf[end] in _AFTER_NUMBER:
+                        self.pos = end
+                        return obj
+                    if self.eof:
+                        raise json.JSONDecodeError("Expecting ',' delimiter", self.buf, end)
+                elif self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # grow geometrically so a large value is re-decoded O(log n) times
+            if self._fill(size):
+                size = max(size, len(self.buf))
+
+    def end(self):
+        """Check that only whitespace is left after the document."""
+        if self.peek():
+            raise json.JSONDecodeError("Extra data", self.buf, self.pos)
+
+    def members(self):
+        """Iterate over the keys of an object; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def elements(self):
+        """Iterate over the items of an array; the caller consumes each item."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def _walk(reader: _Reader) -> dict:
+    """
+    Parse the document one top-level value, and one municipality, at a
+    time. Values of an unexpected shape are decoded as they are and left
+    for check_document() to report.
+    """
+    if reader.peek() != "{":
+        doc = reader.value()
+    else:
+        doc = {}
+        for key in reader.members():
+            if key != "municipalities" or reader.peek() != "[":
+                doc[key] = reader.value()
+                continue
+            munis = doc[key] = []
+            for _ in reader.elements():
+                munis.append(reader.value())
+    reader.end()
+    return doc
+
+
+def load_document(fp, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Parse a results document from a binary or text stream."""
+    return _walk(_Reader(fp, chunk_size))
+
+
+def iter_wards(fp, chunk_size: int = CHUNK_SIZE):
+    """
+    Yield (municipality, ward) pairs from a stream without keeping the
+    document. The municipality dict is yielded without its "wards".
+    Raises SchemaError if a municipality or its ward list has the wrong type.
+    """
+    reader = _Reader(fp, chunk_size)
+    if reader.peek() != "{":
+        raise SchemaError(["document: expected an object"])
+    for key in reader.members():
+        if key != "municipalities":
+            reader.value()
+            continue
+        if reader.peek() != "[":
+            raise SchemaError(["municipalities: expected a list"])
+        for i, _ in enumerate(reader.elements()):
+            muni = reader.value()
+            if type(muni) is not dict:
+                raise SchemaError([f"municipalities[{i}]: expected an object"])
+            wards = muni.pop("wards", [])
+            if type(wards) is not list:
+                raise SchemaError([f"{muni.get('name')!r}.wards: expected a list"])
+            for w in wards:
+                yield muni, w
+    reader.end()
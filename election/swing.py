@@ -0,0 +1,156 @@
+"""
+Vote Share and Swing
+====================
+Party vote share, swing against the previous election and seat flips,
+statewide and broken down by municipality, reserved category
+(SC/ST/OBC/General) and gender, computed once per data version from
+the candidate table.
+
+Vote share is a party's votes over all votes cast in the group; the
+previous share uses each candidate's `prev_votes` the same way, and the
+swing is the difference in percentage points. A ward's previous holder
+is the party of the candidate with the most `prev_votes`; a declared
+ward flips when its winner's party is a different one. Wards contested
+for the first time (no `prev_votes`) count towards vote share but not
+towards swing comparisons or flips.
+
+All candidates are grouped once by (municipality, category, gender,
+party); every breakdown is a roll-up of that small table, so the cost
+is one pass over the candidates however many views read the report.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+
+MAX_CACHED_REPORTS = 2
+
+# Report level -> ward table column it groups by (None: statewide)
+LEVELS = {
+    "state": None,
+    "municipality": "Municipality",
+    "category": "Category",
+    "gender": "Gender",
+}
+_DIMENSIONS = [c for c in LEVELS.values() if c]
+
+SHARE_COLUMNS = ["Party", "Votes", "Vote %", "Prev Votes", "Prev Vote %", "Swing", "Gained", "Lost"]
+FLIP_COLUMNS = ["Declared", "Compared", "Flipped", "Flip %"]
+
+
+class SwingReport:
+    """
+    `shares[level]`: one row per (group, party) with vote share, previous
+    share, swing (points) and seats gained / lost, largest parties first.
+    `flips[level]`: one row per group with declared, compared (declared
+    with a previous holder) and flipped wards.
+    """
+
+    def __init__(self, shares: dict, flips: dict):
+        self.shares = shares
+        self.flips = flips
+
+
+# ---------------------------------------------------------------------------
+# Computation
+# ---------------------------------------------------------------------------
+def _ward_holders(snap) -> pd.DataFrame:
+    """Declared wards with their dimensions, winner party and previous holder."""
+    wards, cands = snap.frame, snap.candidates
+    has_prev = cands["Prev Votes"].notna()
+    top = cands.loc[has_prev].groupby("ward_id", sort=False)["Prev Votes"].idxmax()
+    prev_party = pd.Series(np.nan, index=wards.index, dtype=object)
+    prev_party.iloc[top.index.to_numpy()] = cands["Party"].astype(str).to_numpy()[top.to_numpy()]
+
+    held = wards[_DIMENSIONS].assign(Party=wards["Party"].astype(str), **{"Prev Party": prev_party})
+    held = held[wards["Status"] == "Declared"]
+    compared = held["Prev Party"].notna()
+    return held.assign(
+        Declared=1,
+        Compared=compared,
+        Flipped=compared & (held["Party"] != held["Prev Party"]),
+    )
+
+
+def _shares(base: pd.DataFrame, holders: pd.DataFrame, column) -> pd.DataFrame:
+    keys = ([column] if column else []) + ["Party"]
+    table = base.groupby(keys, observed=True, sort=False)[["Votes", "Prev Votes"]].sum()
+
+    if column:
+        totals = table.groupby(level=0, observed=True).transform("sum")
+    else:
+        totals = table.sum()
+    table["Vote %"] = (100 * table["Votes"] / totals["Votes"]).round(2)
+    prev_total = totals["Prev Votes"].replace(0, np.nan) if column else (totals["Prev Votes"] or np.nan)
+    table["Prev Vote %"] = (100 * table["Prev Votes"] / prev_total).round(2)
+    table["Swing"] = (table["Vote %"] - table["Prev Vote %"]).round(2)
+
+    flipped = holders[holders["Flipped"]]
+    gained = flipped.groupby(keys, observed=True).size()
+    lost = flipped.groupby(keys[:-1] + ["Prev Party"], observed=True).size()
+    lost.index = lost.index.set_names(keys)
+    table["Gained"] = gained.reindex(table.index, fill_value=0)
+    table["Lost"] = lost.reindex(table.index, fill_value=0)
+
+    table = table.reset_index()
+    table["Prev Votes"] = table["Prev Votes"].astype("int64")
+    order = keys[:-1] + ["Votes"]
+    table = table.sort_values(order, ascending=[True] * (len(order) - 1) + [False], kind="stable")
+    return table[keys[:-1] + SHARE_COLUMNS].reset_index(drop=True)
+
+
+def _flips(holders: pd.DataFrame, column) -> pd.DataFrame:
+    counts = holders[FLIP_COLUMNS[:-1]]
+    if column:
+        table = counts.groupby(holders[column], observed=True).sum()
+    else:
+        table = counts.sum().to_frame("Jharkhand").T.rename_axis("State")
+    table["Flip %"] = (100 * table["Flipped"] / table["Compared"].replace(0, np.nan)).round(1)
+    return table.reset_index()
+
+
+def compute(snap) -> SwingReport:
+    """Build the report for `snap` (uncached; see report())."""
+    wards, cands = snap.frame, snap.candidates
+    ward_ids = cands["ward_id"].to_numpy()
+    rows = {c: wards[c].array.take(ward_ids) for c in _DIMENSIONS}
+    rows.update({
+        "Party": cands["Party"].to_numpy(),
+        "Votes": cands["Votes"].to_numpy(),
+        "Prev Votes": cands["Prev Votes"].fillna(0).to_numpy(),
+    })
+    base = (
+        pd.DataFrame(rows)
+        .groupby(_DIMENSIONS + ["Party"], observed=True, sort=False)[["Votes", "Prev Votes"]]
+        .sum()
+        .reset_index()
+        .astype({"Party": str})
+    )
+    holders = _ward_holders(snap)
+    return SwingReport(
+        shares={level: _shares(base, holders, column) for level, column in LEVELS.items()},
+        flips={level: _flips(holders, column) for level, column in LEVELS.items()},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+_reports = OrderedDict()  # version -> SwingReport
+_reports_lock = threading.Lock()
+
+
+def report(snap) -> SwingReport:
+    """The swing report for a snapshot's version, built on first use."""
+    with _reports_lock:
+        result = _reports.get(snap.version)
+        if result is None:
+            with metrics.timer("swing_build"):
+                result = _reports[snap.version] = compute(snap)
+            while len(_reports) > MAX_CACHED_REPORTS:
+                _reports.popitem(last=False)
+        return result